@@ -1,4 +1,11 @@
-from .core import MaxReleaseManager
+__all__ = ["MaxReleaseManager"]
 
 
-__all__ = ["MaxReleaseManager"]
+def __getattr__(name):
+    # imported on first use, so that e.g. the standalone cli does not pay
+    # for core's dependencies at startup
+    if name == "MaxReleaseManager":
+        from .core import MaxReleaseManager
+
+        return MaxReleaseManager
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
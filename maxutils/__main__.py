@@ -57,6 +57,12 @@ class Application(Commander):
         pre.process()
 
 
+    @option("--fast", action="store_true",
+            help="sha1 digests, no timestamp: for development builds only")
+    @option("--fresh", action="store_true",
+            help="discard the cache of previously signed resources")
+    @option("--force", "-f", action="store_true",
+            help="re-sign resources which are already validly signed")
     @option("--dry-run", action="store_true",
             help="run process without actually doing anything")
     @option("--arch", "-a", default="dual",
@@ -68,16 +74,36 @@ class Application(Commander):
     @arg("path", type=str, help="path to standalone")
     def do_standalone_codesign(self, args):
         """codesign max standalone."""
-        sig = standalone.CodeSigner(args.path, args.dev_id, args.entitlements)
+        sig = standalone.CodeSigner(args.path, args.dev_id, args.entitlements,
+                                    force=args.force, fresh=args.fresh,
+                                    fast=args.fast)
         sig.process()
 
 
-    @arg("path", type=str, help="path to package")
+    @option("--staple", "-s", action="store_true",
+            help="staple each artifact as soon as it is accepted")
+    @option("--timeout", type=int, default=3600,
+            help="seconds to wait for a final notarization status")
+    @option("--output-dir", "-o", type=str, default="output",
+            help="output directory")
+    @option("--team-id", "-t", type=str,
+            help="Apple Developer Team ID (default: $TEAM_ID)")
+    @option("--app-bundle-id", "-b", type=str,
+            help="app bundle id (default: $APP_BUNDLE_ID)")
+    @option("--app-password", "-p", type=str,
+            help="app-specific password (default: $APP_PASSWORD)")
+    @option("--apple-id", "-i", type=str,
+            help="Apple ID (default: $APPLE_ID)")
+    @arg("path", type=str, nargs="+", help="path(s) to zip, pkg or dmg")
     def do_standalone_notarize(self, args):
         """notarize codesigned max standalone."""
         notary = standalone.Notarizer(args.path, args.apple_id, args.app_password,
-                            args.app_bundle_id, args.output_dir)
-        notary.process()
+                            args.app_bundle_id, args.output_dir, args.team_id,
+                            args.timeout, args.staple)
+        try:
+            notary.process_all()
+        except standalone.NotarizationError as e:
+            raise SystemExit(str(e)) from e
 
 
     @arg("path", type=str, help="path to zipped standalone")
@@ -89,6 +115,8 @@ class Application(Commander):
 
     @option("--add-file", "-f", action="append",
             help="add a file to app distro package")
+    @option("--parallel-compress", "-p", action="store_true",
+            help="compress to .tgz with pigz using all cores")
     @option("--arch", "-a", default="dual",
             help="set architecture of app (dual|arm64|x86_64)")
     @option("--version", "-v", type=str,
@@ -96,7 +124,9 @@ class Application(Commander):
     @arg("path", type=str, help="path to directory")
     def do_standalone_distribute(self, args):
         """package max standalone for distribution."""
-        dist = standalone.Distributor(args.path, args.version, args.arch, args.add_file)
+        dist = standalone.Distributor(args.path, None, args.version, args.arch,
+                                      parallel_compress=args.parallel_compress,
+                                      extra_files=args.add_file)
         dist.process()
 
 
@@ -105,7 +135,10 @@ class Application(Commander):
     def do_standalone_process(self, args):
         """automated codesign/notarization process from config.json."""
         _standalone = standalone.Standalone.from_config(args.path, args.config_json)
-        product = _standalone.process()
+        try:
+            product = _standalone.process()
+        except standalone.NotarizationError as e:
+            raise SystemExit(str(e)) from e
         assert Path(product).exists()
 
 if __name__ == "__main__":
@@ -45,7 +45,11 @@ def option_group(*options):
 
 
 class MetaCommander(type):
-    """Metaclass to provide argparse boilerplate features to its instance class"""
+    """Metaclass to provide argparse boilerplate features to its instance class
+
+    The argparse parser is built once, when the class is created, and cached
+    as `_argparse_parser`.
+    """
 
     def __new__(cls, classname, bases, classdict):
         subcmds = {}
@@ -61,21 +65,12 @@ class MetaCommander(type):
                     subcmd["options"] = func.options
                 subcmds[name] = subcmd
         classdict["_argparse_subcmds"] = subcmds
-        return type.__new__(cls, classname, bases, classdict)
-
-
-class Commander(metaclass=MetaCommander):
-    """app: description here"""
+        klass = type.__new__(cls, classname, bases, classdict)
+        klass._argparse_parser = cls._build_parser(klass)
+        return klass
 
-    name = "app name"
-    epilog = ""
-    version = "0.1"
-    default_args = ["--help"]
-    _argparse_subcmds: dict  # just to silence static checkers
-    _argparse_levels: int = 0  # how many subcommand levels to create
-    _argparse_structure: dict = {}
-
-    def _add_parser(self, subparsers, subcmd, name=None):
+    @staticmethod
+    def _add_parser(subparsers, subcmd, name=None):
         if not name:
             name = subcmd["name"]
         subparser = subparsers.add_parser(name, help=subcmd["func"].__doc__)
@@ -85,17 +80,18 @@ class Commander(metaclass=MetaCommander):
         subparser.set_defaults(func=subcmd["func"])
         return subparser
 
-    def cmdline(self):
-        """Main commandline function to process commandline arguments and options."""
+    @classmethod
+    def _build_parser(mcs, klass):
+        """build argparse parser from the class's subcommand declarations."""
         parser = argparse.ArgumentParser(
-            # prog = self.name,
+            # prog = klass.name,
             formatter_class=argparse.ArgumentDefaultsHelpFormatter,
-            description=self.__doc__,
-            epilog=self.epilog,
+            description=klass.__doc__,
+            epilog=klass.epilog,
         )
 
         parser.add_argument(
-            "-v", "--version", action="version", version="%(prog)s " + self.version
+            "-v", "--version", action="version", version="%(prog)s " + klass.version
         )
 
         ## default arg
@@ -111,17 +107,17 @@ class Commander(metaclass=MetaCommander):
             metavar="",
         )
 
-        levels = self._argparse_levels
-        structure = self._argparse_structure
-        for name in sorted(self._argparse_subcmds.keys()):  # pylint: disable=E1101
-            subcmd = self._argparse_subcmds[name]  # pylint: disable=E1101
+        levels = klass._argparse_levels
+        structure = klass._argparse_structure = {}
+        for name in sorted(klass._argparse_subcmds.keys()):
+            subcmd = klass._argparse_subcmds[name]
             if not levels:
-                subparser = self._add_parser(subparsers, subcmd)
+                subparser = mcs._add_parser(subparsers, subcmd)
             else:
                 head, *tail = name.split("_")
                 if head and not tail:  # i.e head == name
                     # scenario: single section name and subcmd is given
-                    subparser = self._add_parser(subparsers, subcmd)
+                    subparser = mcs._add_parser(subparsers, subcmd)
                     if head not in structure:
                         structure[head] = subparser.add_subparsers(
                             title=f"{head} subcommands",
@@ -132,12 +128,25 @@ class Commander(metaclass=MetaCommander):
                 else:  # (x:xs)
                     if head in structure:
                         _subparsers = structure[head]
-                        subparser = self._add_parser(
+                        subparser = mcs._add_parser(
                             _subparsers, subcmd, name="_".join(tail)
                         )
+        return parser
 
-        if len(sys.argv) <= 1:
-            options = parser.parse_args(self.default_args)
-        else:
-            options = parser.parse_args()
+
+class Commander(metaclass=MetaCommander):
+    """app: description here"""
+
+    name = "app name"
+    epilog = ""
+    version = "0.1"
+    default_args = ["--help"]
+    _argparse_subcmds: dict  # just to silence static checkers
+    _argparse_parser: argparse.ArgumentParser
+    _argparse_levels: int = 0  # how many subcommand levels to create
+    _argparse_structure: dict = {}
+
+    def cmdline(self):
+        """Main commandline function to process commandline arguments and options."""
+        options = self._argparse_parser.parse_args(sys.argv[1:] or self.default_args)
         options.func(self, options)
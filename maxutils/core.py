@@ -358,7 +358,7 @@ class MaxPackageManager(MaxProductManager):
             if _target.exists():
                 if _target.name in ["externals", "support"]:
                     dst = destination / _target.name
-                    self.cmd(f"ditto {_target} {dst}")
+                    self.cmd.run(["ditto", _target, dst])
                 else:
                     self.cmd.copy(_target, destination)
         for md_file in self.product.path.glob("*.md"):
@@ -369,10 +369,19 @@ class MaxPackageManager(MaxProductManager):
     def package_as_dmg(self):
         srcfolder = self.create_dist()
         assert srcfolder.exists(), f"{srcfolder} does not exist"
-        self.cmd(
-            f"hdiutil create -volname {self.product.name.upper()} "
-            f"-srcfolder {srcfolder} -ov "
-            f"-format UDZO {self.product.dmg}"
+        self.cmd.run(
+            [
+                "hdiutil",
+                "create",
+                "-volname",
+                self.product.name.upper(),
+                "-srcfolder",
+                srcfolder,
+                "-ov",
+                "-format",
+                "UDZO",
+                self.product.dmg,
+            ]
         )
         assert self.product.dmg.exists(), f"{self.product.dmg} does not exist"
         self.cmd.remove(srcfolder)
@@ -385,9 +394,17 @@ class MaxPackageManager(MaxProductManager):
         assert (
             self.product.dmg.exists() and self.dev_id
         ), f"{self.product.dmg} and DEV_ID not set"
-        self.cmd(
-            f'codesign --sign "Developer ID Application: {self.dev_id}" '
-            f'--deep --force --verbose --options runtime "{self.product.dmg}"'
+        self.cmd.run(
+            [
+                "codesign",
+                "--sign",
+                f"Developer ID Application: {self.dev_id}",
+                "--force",
+                "--verbose",
+                "--options",
+                "runtime",
+                self.product.dmg,
+            ]
         )
 
     def notarize_dmg(self):
@@ -397,15 +414,22 @@ class MaxPackageManager(MaxProductManager):
         assert (
             self.product.dmg.exists() and self.dev_id
         ), f"{self.product.dmg} and KEYCHAIN_PROFILE not set"
-        self.cmd(
-            f'xcrun notarytool submit "{self.product.dmg}"'
-            ' --keychain-profile "{self.keychain_profile}"'
+        self.cmd.run(
+            [
+                "xcrun",
+                "notarytool",
+                "submit",
+                self.product.dmg,
+                "--keychain-profile",
+                self.keychain_profile,
+                "--wait",
+            ]
         )
 
     def staple_dmg(self):
         """staple .dmg using notarytool"""
         assert self.product.dmg.exists(), f"{self.product.dmg} not set"
-        self.cmd(f'xcrun stapler staple "{self.product.dmg}"')
+        self.cmd.run(["xcrun", "stapler", "staple", self.product.dmg])
 
     def collect_dmg(self):
         """zip and collect stapled dmg in folder"""
@@ -204,7 +204,6 @@ class ExternalFixer:
             "/usr/bin/codesign",
             "-s",
             "-",
-            "--deep",
             "--force",
             "--preserve-metadata=identifier,entitlements,flags,runtime",
         ]
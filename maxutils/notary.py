@@ -0,0 +1,86 @@
+"""notary.py
+
+Synchronous notarytool submission, shared by the standalone scripts.
+
+"""
+import json
+import logging
+import random
+import subprocess
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+FINAL_STATUSES = ("Accepted", "Invalid", "Rejected")
+
+# network and throttling failures of the notary service, which are retried;
+# anything else (bad credentials or arguments, a missing file) is not
+TRANSIENT_ERRORS = (
+    "timed out",
+    "network connection",
+    "could not connect",
+    "connection reset",
+    "too many requests",
+    "http status code: 429",
+    "http status code: 500",
+    "http status code: 502",
+    "http status code: 503",
+    "http status code: 504",
+    "service unavailable",
+)
+
+
+def is_transient(message: str) -> bool:
+    """check if a notarytool error message reports a transient failure"""
+    message = message.lower()
+    return any(error in message for error in TRANSIENT_ERRORS)
+
+
+def submit(
+    path: str | Path,
+    apple_id: str,
+    app_password: str,
+    team_id: str,
+    log: Optional[logging.Logger] = None,
+    retries: int = 5,
+) -> dict[str, Any]:
+    """submit path to the notary service, waiting for a final status.
+
+    Transient failures are retried with exponential backoff (with jitter,
+    capped at 60s); the json result, or `{"message": <error>}` if there is
+    none, is returned as soon as it is final or the failure is not transient.
+    """
+    log = log or logging.getLogger(__name__)
+    result: dict[str, Any] = {}
+    for attempt in range(retries):
+        res = subprocess.run(
+            [
+                "xcrun",
+                "notarytool",
+                "submit",
+                str(path),
+                "--apple-id",
+                apple_id,
+                "--password",
+                app_password,
+                "--team-id",
+                team_id,
+                "--wait",
+                "--output-format",
+                "json",
+            ],
+            capture_output=True,
+            encoding="utf8",
+        )
+        try:
+            result = json.loads(res.stdout)
+        except ValueError:
+            result = {"message": res.stderr.strip() or res.stdout.strip()}
+        message = str(result.get("message", ""))
+        if result.get("status") in FINAL_STATUSES or not is_transient(message):
+            return result
+        if attempt + 1 < retries:
+            delay = min(60, 2**attempt + random.random())
+            log.warning("notarytool: %s (retrying in %.0fs)", message, delay)
+            time.sleep(delay)
+    return result
@@ -1,12 +1,104 @@
+import hashlib
+import json
 import os
 import shutil
 import subprocess
 import logging
+import stat
+import time
+import zipfile
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional, Sequence
 
 from .config import DEBUG
 
+# already-compressed formats, stored as is by ShellCmd.zip
+STORED_SUFFIXES = frozenset(
+    [".png", ".jpg", ".jpeg", ".gif", ".icns", ".mp3", ".m4a", ".aac", ".mp4",
+     ".mov", ".zip", ".gz", ".bz2", ".xz", ".jar"]
+)
+
+# json caches (signing, notarization) are kept under ~/.cache/maxutils
+CACHE_DIR = Path.home() / ".cache" / "maxutils"
+
+
+def is_real_dir(path: str | Path) -> bool:
+    """check if path is a directory, and not a symlink to one"""
+    return os.path.isdir(path) and not os.path.islink(path)
+
+
+def dir_size(path: str | Path) -> int:
+    """total size in bytes of all files under path (symlinks not followed)"""
+    if not is_real_dir(path):
+        return os.lstat(path).st_size
+    total = 0
+    stack = [str(path)]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                else:
+                    total += entry.stat(follow_symlinks=False).st_size
+    return total
+
+
+def format_size(nbytes: int) -> str:
+    """format a size in bytes for display"""
+    return f"{nbytes / 1e6:.1f}M"
+
+
+def file_digest(path: str | Path) -> str:
+    """sha256 hexdigest of file contents (read in 1MB chunks)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fopen:
+        for chunk in iter(lambda: fopen.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def bundle_fingerprint(path: str | Path) -> str:
+    """blake2b fingerprint of a file or folder's (relpath, size, mtime) entries"""
+    root = str(path)
+    entries = []
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                attrs = entry.stat(follow_symlinks=False)
+                entries.append(
+                    (os.path.relpath(entry.path, root), attrs.st_size, attrs.st_mtime_ns)
+                )
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+    fingerprint = hashlib.blake2b(digest_size=16)
+    for entry in sorted(entries):
+        fingerprint.update(repr(entry).encode("utf8"))
+    return fingerprint.hexdigest()
+
+
+def write_if_changed(path: str | Path, data: bytes) -> Path:
+    """write data to path unless path already holds exactly that data"""
+    path = Path(path)
+    if not path.exists() or path.read_bytes() != data:
+        path.write_bytes(data)
+    return path
+
+
+def load_cache(name: str) -> dict[str, Any]:
+    """load json cache `name` from CACHE_DIR"""
+    try:
+        with open(CACHE_DIR / name, encoding="utf8") as fopen:
+            return json.load(fopen)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(name: str, cache: dict[str, Any]):
+    """save json cache `name` to CACHE_DIR"""
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    with open(CACHE_DIR / name, "w", encoding="utf8") as fopen:
+        json.dump(cache, fopen, indent=2)
 
 
 class ShellCmd:
@@ -19,13 +111,24 @@ class ShellCmd:
             self.log = log
 
     def cmd(self, shellcmd: str, *args, **kwargs):
-        """Run shell command with args and keywords"""
+        """Run shell command with args and keywords
+
+        Spawns an intermediary shell: prefer `run` with an argument list.
+        """
         _cmd = shellcmd.format(*args, **kwargs)
         self.log.info(_cmd)
         os.system(_cmd)
 
     __call__ = cmd
 
+    def run(
+        self, arglist: Sequence[str | Path], check: bool = True
+    ) -> subprocess.CompletedProcess:
+        """run cmd from an argument list without an intermediary shell"""
+        args = [str(a) for a in arglist]
+        self.log.info(" ".join(args))
+        return subprocess.run(args, check=check)
+
     def cmd_output(self, arglist: list[str]) -> str:
         """capture and return shell cmd output."""
         self.log.debug(" ".join(arglist))
@@ -90,6 +193,89 @@ class ShellCmd:
         else:
             shutil.copy2(src, dst)
 
+    def zip(self, src: Path | str, dst: Path | str, compression: Optional[int] = None):
+        """create a zip archive of src path at dst path, in-process.
+
+        Like `ditto -c -k --keepParent`, entries are rooted at src's name.
+        Symlinks are stored as links and file modes are preserved. Files are
+        streamed into the archive, and already-compressed formats (see
+        STORED_SUFFIXES) are stored rather than deflated again.
+        `compression` is the zlib level (0-9), 0 storing entries as is.
+        """
+        self.log.info("zipping %s as %s", src, dst)
+        src = Path(src)
+        method = zipfile.ZIP_STORED if compression == 0 else zipfile.ZIP_DEFLATED
+        with zipfile.ZipFile(dst, "w", method, compresslevel=compression) as archive:
+            archive.write(src, src.name)
+            # iterative scandir walk: entries are streamed into the archive
+            # as they are found, holding only the pending directories
+            stack = [str(src)]
+            while stack:
+                with os.scandir(stack.pop()) as entries:
+                    for entry in entries:
+                        arcname = os.path.relpath(entry.path, src.parent)
+                        if entry.is_symlink():
+                            attrs = entry.stat(follow_symlinks=False)
+                            info = zipfile.ZipInfo(
+                                arcname, time.localtime(attrs.st_mtime)[:6]
+                            )
+                            info.external_attr = (attrs.st_mode & 0xFFFF) << 16
+                            archive.writestr(info, os.readlink(entry.path))
+                            continue
+                        if entry.is_dir():
+                            stack.append(entry.path)
+                            archive.write(entry.path, arcname)
+                        elif os.path.splitext(entry.name)[1].lower() in STORED_SUFFIXES:
+                            archive.write(entry.path, arcname, zipfile.ZIP_STORED)
+                        else:
+                            archive.write(entry.path, arcname)
+
+    def unzip(self, src: Path | str, dst: Path | str):
+        """extract a zip archive at src path into the dst folder, in-process.
+
+        The inverse of `zip`: members are streamed out one at a time, and
+        symlinks and file modes, which `ZipFile.extractall` drops (breaking
+        signed bundles), are restored. Members which would be written, or
+        symlinks which would point, outside of dst are refused. Entries
+        already in dst (e.g. a previous copy of the bundle) are replaced.
+        """
+        self.log.info("unzipping %s to %s", src, dst)
+        dst = Path(dst)
+        root = os.path.realpath(dst)
+        folders = []
+        with zipfile.ZipFile(src) as archive:
+            for info in archive.infolist():
+                path = dst.joinpath(*Path(info.filename).parts)
+                # resolve through any symlinks already extracted
+                parent = os.path.realpath(path.parent)
+                if os.path.commonpath([root, parent]) != root:
+                    raise ValueError(f"unsafe member in archive: {info.filename}")
+                if os.path.lexists(path) and not (info.is_dir() and is_real_dir(path)):
+                    if is_real_dir(path):
+                        shutil.rmtree(path)
+                    else:
+                        os.unlink(path)
+                mode = info.external_attr >> 16
+                if not stat.S_ISLNK(mode):
+                    extracted = archive.extract(info, dst)
+                    if info.is_dir():
+                        folders.append((extracted, mode))
+                    elif mode:
+                        os.chmod(extracted, stat.S_IMODE(mode))
+                    continue
+                target = archive.read(info).decode("utf8")
+                resolved = os.path.realpath(os.path.join(parent, target))
+                if os.path.isabs(target) or os.path.commonpath([root, resolved]) != root:
+                    raise ValueError(
+                        f"unsafe symlink in archive: {info.filename} -> {target}"
+                    )
+                path.parent.mkdir(parents=True, exist_ok=True)
+                os.symlink(target, path)
+        # directory modes last, so read-only folders can still be filled
+        for path, mode in reversed(folders):
+            if mode:
+                os.chmod(path, stat.S_IMODE(mode))
+
     def remove(self, path: Path | str):
         """Remove file or folder."""
         path = Path(path)
@@ -110,44 +296,61 @@ class MacShellCmd(ShellCmd):
     """macos-platform shellcmd subclass"""
 
     def copy(self, src_path: Path | str, dst_path: Path | str):
-        """recursively copy from src path to dst path."""
+        """recursively copy from src path to dst path.
+
+        Tries a copy-on-write clone (`cp -c`, APFS only) first, falling back
+        to a full copy with `ditto`.
+        """
         self.log.info("copying: %s to %s", src_path, dst_path)
-        self.cmd(f"ditto '{src_path}' '{dst_path}'")
+        if not Path(dst_path).exists():
+            res = self.run(["cp", "-c", "-R", "-p", src_path, dst_path], check=False)
+            if res.returncode == 0:
+                return
+            if Path(dst_path).exists():  # partial clone
+                self.remove(dst_path)
+        self.run(["ditto", src_path, dst_path])
 
     def install_name_tool(self, src: Path | str, dst: Path | str, mode: str = "id"):
         """change dynamic shared library install names"""
-        _cmd = f"install_name_tool -{mode} {src} {dst}"
-        self.log.info(_cmd)
-        self.cmd(_cmd)
+        self.run(["install_name_tool", f"-{mode}", src, dst])
 
     def install_name_tool_id(self, new_id: str, target: Path | str):
         """change dynamic shared library install names"""
-        _cmd = f"install_name_tool -id '{new_id}' '{target}'"
-        self.log.info(_cmd)
-        self.cmd(_cmd)
+        self.run(["install_name_tool", "-id", new_id, target])
 
     def install_name_tool_change(self, src: str, dst: str, target: Path | str):
         """change dependency reference"""
-        _cmd = f"install_name_tool -change '{src}' '{dst}' '{target}'"
-        self.log.info(_cmd)
-        self.cmd(_cmd)
+        self.run(["install_name_tool", "-change", src, dst, target])
 
     def install_name_tool_add_rpath(self, rpath: str, target: Path | str):
         """change dependency reference"""
-        _cmd = f"install_name_tool -add_rpath '{rpath}' '{target}'"
-        self.log.info(_cmd)
-        self.cmd(_cmd)
+        self.run(["install_name_tool", "-add_rpath", rpath, target])
 
     def notify(self, title: str, txt: str):
         """notify via macos, notifcation with title and text."""
-        self.cmd(
-            f"""osascript -e 'display notification "{txt}" with title "{title}"'"""
+        self.run(
+            ["osascript", "-e", f'display notification "{txt}" with title "{title}"']
         )
 
-    def zip(self, src: Path | str, dst: Path | str):
+    def zip(self, src: Path | str, dst: Path | str, compression: Optional[int] = None):
         """create a zip archive of src path at dst path.
 
-        Expects a folder 'src' parameter.
+        Expects a folder 'src' parameter. `compression` is the zlib level
+        (0-9), ditto's default is used if not given. Unlike the in-process
+        `ShellCmd.zip`, ditto preserves extended attributes, which hold the
+        signatures of codesigned non-Mach-O files.
         """
         self.log.info("zipping %s as %s", src, dst)
-        self.cmd(f"ditto -c -k --keepParent '{src}' '{dst}'")
+        options = ["-c", "-k", "--keepParent"]
+        if compression is not None:
+            options += ["--zlibCompressionLevel", str(compression)]
+        self.run(["ditto", *options, src, dst])
+
+    def unzip(self, src: Path | str, dst: Path | str):
+        """extract a zip archive at src path into the dst folder.
+
+        Uses `ditto -x -k`, the counterpart of `zip`, which restores the
+        extended attributes that ditto stores as AppleDouble entries.
+        """
+        self.log.info("unzipping %s to %s", src, dst)
+        self.run(["ditto", "-x", "-k", src, dst])
@@ -1,28 +1,35 @@
 import argparse
+import collections
+import itertools
 from pathlib import Path
 from typing import Optional
 import logging
 import os
+import subprocess
 
 from .shell import MacShellCmd as ShellCmd
+from .shell import bundle_fingerprint, load_cache, save_cache
 
 
 class CodesignExternal:
     """Recursively codesign an external."""
 
-    FOLDER_EXTENSIONS = [".mxo", ".framework", ".app", ".bundle"]
-    FILE_EXTENSIONS = [".so", ".dylib"]
+    FOLDER_EXTENSIONS = frozenset([".mxo", ".framework", ".app", ".bundle"])
+    FILE_EXTENSIONS = frozenset([".so", ".dylib"])
     FILE_PATTERNS = {
         "pattern1": "runtime",
         "pattern2": "runtime",
         "pattern3": "runtime",
     }
+    max_procs = os.cpu_count() or 1  # concurrent codesign processes
+    CACHE = "signed.json"
 
     def __init__(
         self,
         path: str | Path,
         dev_id: Optional[str]  = None,
         entitlements: Optional[str] = None,
+        fresh: bool = False,
     ):
         self.path = Path(path)
         self.dev_id = dev_id or os.getenv("DEV_ID")
@@ -37,12 +44,14 @@ class CodesignExternal:
         )
         self.log = logging.getLogger(self.__class__.__name__)
         self.cmd = ShellCmd(self.log)
+        self.cache = {} if fresh else load_cache(self.CACHE)
+        self._stats: dict[Path, os.stat_result] = {}  # from the collect walk
+        self._dirty: set[Path] = set()  # containers of paths signed this run
         self._cmd_codesign = [
             "codesign",
             "--sign",
-            f"{self.authority}",
+            self.authority,
             "--timestamp",
-            "--deep",
             "--force",
         ]
 
@@ -51,7 +60,7 @@ class CodesignExternal:
     def authority(self) -> str:
         """authority includes developer id"""
         if self.dev_id and self.dev_id != "-":
-            return repr(f"Developer ID Application: {self.dev_id}")
+            return f"Developer ID Application: {self.dev_id}"
         else:
             return "-"
 
@@ -97,53 +106,140 @@ class CodesignExternal:
         print(*args)
 
     def collect(self):
-        """build up a list of target binaries"""
-        for root, folders, files in os.walk(self.path):
-            for fname in files:
-                path = Path(root) / fname
-                for pattern in self.FILE_PATTERNS:
-                    if fname == pattern:
-                        if self.FILE_PATTERNS[fname] == "runtime":
-                            self.targets.runtimes.add(path)
-                        else:
-                            self.targets.internals.add(path)
-                for _ in self.FILE_EXTENSIONS:
-                    if path.suffix not in self.FILE_EXTENSIONS:
-                        continue
-                    if path.is_symlink():
-                        continue
-                    if path.suffix in self.FILE_EXTENSIONS:
-                        self.log.debug("added binary: %s", path)
-                        self.targets.internals.add(path)
-            for folder in folders:
-                path = Path(root) / folder
-                for _ in self.FOLDER_EXTENSIONS:
-                    if path.suffix not in self.FOLDER_EXTENSIONS:
-                        continue
-                    if path.is_symlink():
+        """build up a list of target binaries in a single os.scandir walk"""
+        stack = [str(self.path)]
+        while stack:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_symlink():
                         continue
-                    if path.suffix in self.FOLDER_EXTENSIONS:
+                    suffix = os.path.splitext(entry.name)[1]
+                    if entry.is_dir():
+                        stack.append(entry.path)
+                        if suffix not in self.FOLDER_EXTENSIONS:
+                            continue
+                        path = Path(entry.path)
                         self.log.debug("added bundle: %s", path)
-                        if path.suffix == ".framework":
+                        if suffix == ".framework":
                             self.targets.frameworks.add(path)
-                        elif path.suffix == ".app":
+                        elif suffix == ".app":
                             self.targets.apps.add(path)
                         else:
                             self.targets.internals.add(path)
+                        continue
+                    if entry.name in self.FILE_PATTERNS:
+                        path = Path(entry.path)
+                        self._stats[path] = entry.stat(follow_symlinks=False)
+                        if self.FILE_PATTERNS[entry.name] == "runtime":
+                            self.targets.runtimes.add(path)
+                        else:
+                            self.targets.internals.add(path)
+                    if suffix in self.FILE_EXTENSIONS:
+                        self.log.debug("added binary: %s", entry.path)
+                        path = Path(entry.path)
+                        self._stats[path] = entry.stat(follow_symlinks=False)
+                        self.targets.internals.add(path)
+
+    @staticmethod
+    def inside_out(paths) -> list[Path]:
+        """order paths deepest first (so nested paths precede their parents),
+        then by name for a deterministic order within each depth"""
+        return sorted(paths, key=lambda p: (-len(p.parts), p.as_posix()))
+
+    def _stamp(self, path: Path) -> str:
+        """cache stamp of a target: mtime and size for files, a fingerprint
+        of every entry for bundles (whose own mtime misses nested changes)"""
+        if path.is_dir():
+            return f"{bundle_fingerprint(path)}:{self.authority}"
+        stat = self._stats.pop(path, None) or os.stat(path, follow_symlinks=False)
+        return f"{stat.st_mtime_ns}:{stat.st_size}:{self.authority}"
+
+    def is_unchanged(self, path: Path) -> bool:
+        """check if path was signed by this authority in a previous run and
+        neither it nor anything nested in it has changed since"""
+        stamp = self.cache.get(str(path))
+        return (
+            stamp is not None
+            and path not in self._dirty
+            and stamp == self._stamp(path)
+        )
+
+    def signed(self, path: Path):
+        """record a freshly signed path, invalidating its containers"""
+        self._stats.pop(path, None)
+        self.cache[str(path)] = self._stamp(path)
+        self._dirty.update(path.parents)
 
     def remove_signature(self):
         """remove signature"""
-        self.cmd(f"codesign --remove-signature {self.path}")
+        self.cmd.run(["codesign", "--remove-signature", self.path])
+
+    def codesign(self, arglist: list[str]):
+        """run codesign, discarding its output unless it fails"""
+        try:
+            subprocess.run(
+                self._cmd_codesign + arglist,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                check=True,
+            )
+        except subprocess.CalledProcessError as e:
+            self.log.critical(e.stderr.decode("utf8", "replace"))
+            raise
 
     def sign_internal_binary(self, path: Path):
         """sign internal binaries"""
-        codesign_cmd = " ".join(self._cmd_codesign + [str(path)])
-        self.cmd(codesign_cmd)
+        self.codesign([str(path)])
+        self.signed(path)
+
+    def sign_internal_binaries(self, paths):
+        """sign binaries inside-out, pipelining up to `max_procs` codesign
+        processes from this thread.
+
+        Paths of equal depth are independent, so each depth wave is spawned
+        with Popen and reaped oldest-first; a wave completes before the
+        next (shallower) one starts. Paths unchanged since they were last
+        signed are skipped.
+        """
+        waves = itertools.groupby(self.inside_out(paths), key=lambda p: len(p.parts))
+        for _, wave in waves:
+            running: collections.deque = collections.deque()
+            try:
+                for path in wave:
+                    if self.is_unchanged(path):
+                        self.log.debug("unchanged: %s", path)
+                        continue
+                    if len(running) >= self.max_procs:
+                        self._reap(running.popleft())
+                    self.log.info("signing: %s", path)
+                    running.append(
+                        subprocess.Popen(
+                            self._cmd_codesign + [str(path)],
+                            stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE,
+                        )
+                    )
+                while running:
+                    self._reap(running.popleft())
+            finally:
+                for proc in running:
+                    proc.wait()
+
+    def _reap(self, proc: subprocess.Popen):
+        """wait for a codesign process, raising if it failed"""
+        _, stderr = proc.communicate()
+        if proc.returncode:
+            self.log.critical(stderr.decode("utf8", "replace"))
+            raise subprocess.CalledProcessError(proc.returncode, proc.args, stderr=stderr)
+        self.signed(Path(proc.args[-1]))
 
     def sign_runtime(self, path=None):
         """sign top-level bundle runtime"""
         if not path:
             path = self.path
+        if self.is_unchanged(path):
+            self.log.debug("unchanged: %s", path)
+            return
         _cmds = [
             "--options",
             "runtime",
@@ -153,8 +249,9 @@ class CodesignExternal:
             _cmds.append(str(self.entitlements))
 
         _cmds.append(str(path))
-        codesign_runtime = " ".join(self._cmd_codesign + _cmds)
-        self.cmd(codesign_runtime)
+        self.log.info("signing runtime: %s", path)
+        self.codesign(_cmds)
+        self.signed(path)
 
     def process(self):
         """main process to recursive sign."""
@@ -165,27 +262,17 @@ class CodesignExternal:
         if not self.targets.internals:
             self.collect()
 
-        self.section("SIGNING INTERNAL TARGETS")
-        for path in self.targets.internals:
-            self.sign_internal_binary(path)
-
-        self.section("SIGNING APPS")
-        for path in self.targets.apps:
-            macos_path = path / "Contents" / "MacOS"
-            for exe in macos_path.iterdir():
-                self.sign_internal_binary(exe)
-            self.sign_runtime(path)
-
-        self.section("SIGNING OTHER RUNTIMES")
-        for path in self.targets.runtimes:
-            self.sign_runtime(path)
-
-        self.section("SIGNING FRAMEWORKS")
-        for path in self.targets.frameworks:
-            self.sign_internal_binary(path)
-
-        self.section("SIGNING MAIN RUNTIME")
-        self.sign_runtime()
+        # all nested code is signed explicitly in one innermost-first pass:
+        # each depth wave completes before the next (shallower) one, so every
+        # container is sealed after everything inside it and no codesign call
+        # needs --deep
+        self.section("SIGNING NESTED TARGETS")
+        try:
+            self.sign_nested()
+            self.section("SIGNING MAIN RUNTIME")
+            self.sign_runtime()
+        finally:
+            save_cache(self.CACHE, self.cache)
 
         self.section("VERIFYING SIGNATURE")
         if not self.verify(self.path):
@@ -193,3 +280,19 @@ class CodesignExternal:
 
         print()
         self.log.info("DONE!")
+
+    def sign_nested(self):
+        """sign all collected targets in depth waves, innermost first"""
+        runtimes = self.targets.apps | self.targets.runtimes
+        binaries = self.targets.internals | self.targets.frameworks
+        for app in self.targets.apps:
+            macos_path = app / "Contents" / "MacOS"
+            if macos_path.is_dir():
+                binaries.update(macos_path.iterdir())
+        ordered = self.inside_out(binaries | runtimes)
+        for _, group in itertools.groupby(ordered, key=lambda p: len(p.parts)):
+            wave = list(group)
+            self.sign_internal_binaries([p for p in wave if p not in runtimes])
+            for path in wave:
+                if path in runtimes:
+                    self.sign_runtime(path)
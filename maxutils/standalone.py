@@ -5,17 +5,31 @@ A cli tool to manage post-production tasks for max standalones.
 
 """
 # pylint: disable = R0913, R0902, C0103
+import collections
 import os
-import datetime
+import itertools
 import json
 import logging
-import plistlib
+import re
+import shutil
 import subprocess
-import sys
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from functools import cache, cached_property
 from pathlib import Path
-from typing import Optional, Any
+from typing import Optional, Any, Iterator, Sequence
 
 from .shell import MacShellCmd as ShellCmd
+from .shell import (
+    bundle_fingerprint,
+    dir_size,
+    file_digest,
+    format_size,
+    load_cache,
+    save_cache,
+    write_if_changed,
+)
 from .config import DEBUG
 
 __all__ = ["Standalone"]
@@ -27,6 +41,12 @@ __all__ = ["Standalone"]
 # ----------------------------------------------------------------------------
 # CONSTANTS
 
+# universal (fat) Mach-O magic numbers (FAT_MAGIC, FAT_MAGIC_64)
+FAT_MAGICS = (b"\xca\xfe\xba\xbe", b"\xca\xfe\xba\xbf")
+
+# in-process xattr support (not available on macOS builds of python)
+HAVE_XATTR = hasattr(os, "listxattr")
+
 CONFIG: dict[str, Any] = {
     "standalone": "External.app",
     "arch": "dual",
@@ -35,6 +55,7 @@ CONFIG: dict[str, Any] = {
     "apple_id": "bugs.bunny@icloud.com",
     "password": "xxxx-xxxx-xxxx-xxxx",
     "bundle_id": "com.acme.fx",
+    "team_id": "ABCDE12345",
     "include": ["README.md"],
     "entitlements": {
         "com.apple.security.automation.apple-events": True,
@@ -48,6 +69,23 @@ CONFIG: dict[str, Any] = {
     },
 }
 
+# pre-serialized forms of the static defaults above
+CONFIG_JSON: bytes = json.dumps(CONFIG, indent=2).encode("utf8")
+
+# formatted directly (byte-identical to plistlib.dumps): the keys are trusted
+# constants and every value is a boolean
+ENTITLEMENTS_PLIST: bytes = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<!DOCTYPE plist PUBLIC "-//Apple//DTD PLIST 1.0//EN" '
+    '"http://www.apple.com/DTDs/PropertyList-1.0.dtd">\n'
+    '<plist version="1.0">\n<dict>\n'
+    + "".join(
+        f"\t<key>{key}</key>\n\t<{'true' if value else 'false'}/>\n"
+        for key, value in CONFIG["entitlements"].items()
+    )
+    + "</dict>\n</plist>\n"
+).encode("utf8")
+
 # ----------------------------------------------------------------------------
 # LOGGING CONFIGURATION
 
@@ -87,10 +125,66 @@ logging.basicConfig(level=logging.DEBUG if DEBUG else logging.INFO, handlers=[ha
 # UTILITY FUNCTIONS
 
 
+class NullProgressbar:
+    """no-op progressbar, used if tqdm is not installed"""
+
+    def __init__(self, *args, **kwds):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def update(self, n=1):
+        """no-op"""
+
+
+@cache
+def get_progressbar() -> type:
+    """tqdm's progressbar if installed (imported on first use)"""
+    try:
+        import tqdm  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return NullProgressbar
+    return tqdm.tqdm
+
+
+def is_fat_binary(path: str | Path) -> bool:
+    """check if path is a universal (multi-architecture) Mach-O binary"""
+    try:
+        with open(path, "rb") as fopen:
+            header = fopen.read(8)
+    except OSError:
+        return False
+    # java class files share FAT_MAGIC but their next word (version) is >= 45
+    return header[:4] in FAT_MAGICS and 0 < int.from_bytes(header[4:], "big") < 45
+
+
+def clear_xattrs(path: str | Path):
+    """remove all extended attributes from path (requires HAVE_XATTR)"""
+    try:
+        for attr in os.listxattr(path, follow_symlinks=False):
+            os.removexattr(path, attr, follow_symlinks=False)
+    except OSError:
+        pass
+
+
 # ----------------------------------------------------------------------------
 # CLASSES
 
 
+class NotarizationError(RuntimeError):
+    """raised when one or more artifacts failed notarization"""
+
+    def __init__(self, failures: dict[Path, BaseException]):
+        self.failures = failures
+        super().__init__(
+            "notarization failed: " + ", ".join(path.name for path in failures)
+        )
+
+
 class Generator:
     """standalone generator class
 
@@ -107,7 +201,7 @@ class Generator:
     def __repr__(self):
         return f"<{self.__class__.__name__}>"
 
-    @property
+    @cached_property
     def appname(self) -> str:
         """derives lower-case app name from standalone name <appname>.app"""
         return self.path.stem.lower()
@@ -116,17 +210,13 @@ class Generator:
         """generates a default enttitelements.plist file"""
         if not path:
             path = f"{self.appname}-entitlements.plist"
-        with open(path, "wb") as fopen:
-            plistlib.dump(CONFIG["entitlements"], fopen)
-        return Path(path)
+        return write_if_changed(path, ENTITLEMENTS_PLIST)
 
     def generate_config(self, path: Optional[str | Path] = None) -> Path:
         """generates a default configuration.json file"""
         if not path:
             path = f"{self.appname}.json"
-        with open(path, "w", encoding="utf8") as fopen:
-            json.dump(CONFIG, fopen, indent=2)
-        return Path(path)
+        return write_if_changed(path, CONFIG_JSON)
 
 
 class PreProcessor:
@@ -152,6 +242,7 @@ class PreProcessor:
         self.arch = arch
         self.remove_attrs = remove_attrs
         self.norm_perms = norm_perms
+        self._initial_size: Optional[str] = None
         self.log = logging.getLogger(self.__class__.__name__)
         self.cmd = ShellCmd(self.log)
 
@@ -162,40 +253,102 @@ class PreProcessor:
         """get total size of target path"""
         if not path:
             path = self.path
-        return self.cmd.cmd_output(["du", "-s", "-h", str(path)]).strip()
+        return format_size(dir_size(path))
+
+    def scan(self) -> tuple[int, list[Path]]:
+        """single pass over the bundle.
+
+        Returns the total size of the bundle and its fat binaries, removing
+        extended attributes on the way if requested (and HAVE_XATTR).
+        """
+        strip_attrs = self.remove_attrs and HAVE_XATTR
+        total = 0
+        fat_binaries = []
+        if strip_attrs:
+            clear_xattrs(self.path)
+        stack = [str(self.path)]
+        while stack:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if strip_attrs:
+                        clear_xattrs(entry.path)
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                        continue
+                    stat = entry.stat(follow_symlinks=False)
+                    total += stat.st_size
+                    # fat slices are page-aligned, so smaller files are thin
+                    if (
+                        stat.st_size > 4096
+                        and entry.is_file(follow_symlinks=False)
+                        and is_fat_binary(entry.path)
+                    ):
+                        fat_binaries.append(Path(entry.path))
+        return total, fat_binaries
 
     def remove_attributes(self):
         """recursively remove extended attributes from bundle"""
-        self.cmd(f"xattr -cr {self.path}")
+        self.cmd.run(["xattr", "-cr", self.path])
+
+    def thin(self, binary: Path) -> int:
+        """thin a fat binary in place to self.arch, returning bytes saved"""
+        tmp = binary.with_name(f"{binary.name}__tmp")
+        size = binary.stat().st_size
+        res = subprocess.run(
+            ["lipo", "-thin", self.arch, "-output", str(tmp), str(binary)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            encoding="utf8",
+        )
+        if res.returncode != 0:
+            self.log.warning("not thinned: %s: %s", binary, res.stderr.strip())
+            return 0
+        shutil.copymode(binary, tmp)
+        os.replace(tmp, binary)
+        return size - binary.stat().st_size
 
-    def shrink(self):
-        """recursively thins fat binaries in a given folder"""
-        self.log.info("shrinking: %s", self.path)
-        tmp = self.path.parent / f"{self.path.name}__tmp"
-        self.log.info("START: %s", self.path)
-        self.cmd(f"ditto --arch '{self.arch}' '{self.path}' '{tmp}'")
-        self.cmd(f"rm -rf '{self.path}'")
-        self.cmd(f"mv '{tmp}' '{self.path}'")
+    def shrink(self, fat_binaries: Optional[list[Path]] = None) -> int:
+        """thins fat binaries in the bundle in place, returning bytes saved.
+
+        Only the fat binaries are rewritten (concurrently, one `lipo` each);
+        the rest of the bundle is left untouched.
+        """
+        if fat_binaries is None:
+            _, fat_binaries = self.scan()
+        self.log.info("shrinking: %s (%s fat binaries)", self.path, len(fat_binaries))
+        with ThreadPoolExecutor() as pool:
+            return sum(pool.map(self.thin, fat_binaries))
 
     def normalize_permissions(self):
         """recursively normalize permissions (u+rw) in app bundle."""
         self.log.info("change permissions of %s via 'sudo chmod -R u+rw'", self.path)
-        self.cmd(f"chmod -R u+rw {self.path}")
+        self.cmd.run(["chmod", "-R", "u+rw", self.path])
 
     def process(self) -> Path:
-        """main class process"""
-        if self.remove_attrs:
-            self.log.info("recursively removing extended attributes from app bundle")
-            self.remove_attributes()
+        """main class process
+
+        Attribute removal, size measurement and detection of fat binaries
+        share a single traversal of the bundle (see `scan`).
+        """
         if self.norm_perms:
             self.log.info("recursively normalizing permissions to u+rw in app bundle")
             self.normalize_permissions()
+        if self.remove_attrs:
+            self.log.info("recursively removing extended attributes from app bundle")
+            if not HAVE_XATTR:
+                self.remove_attributes()
+        if not (self.remove_attrs and HAVE_XATTR) and self.arch == "dual":
+            return self.path
+        size, fat_binaries = self.scan()
         if self.arch != "dual":
-            initial_size = self.get_size()
+            self._initial_size = format_size(size)
+            if not fat_binaries:
+                self.log.info("no fat binaries: nothing to shrink")
+                return self.path
             self.log.info("shrinking to %s", self.arch)
-            self.shrink()
-            self.log.info("BEFORE: %s", initial_size)
-            self.log.info("AFTER:  %s", self.get_size())
+            saved = self.shrink(fat_binaries)
+            self.log.info("BEFORE: %s", self._initial_size)
+            self.log.info("AFTER:  %s", format_size(size - saved))
         return self.path
 
 
@@ -207,29 +360,55 @@ class CodeSigner:
         -> a-signed.zip
     """
 
+    EXTENSIONS = [".mxo", ".framework", ".dylib", ".bundle"]
+    batch_size = 32  # max paths per codesign invocation
+    batch_arg_bytes = 100_000  # max argv bytes per codesign invocation
+    max_workers = os.cpu_count()  # concurrent codesign invocations
+
     def __init__(
         self,
         path: Path | str,
         dev_id: Optional[str] = None,
         entitlements: Optional[str | Path] = None,
         package_as="zip",
+        force: bool = False,
+        fresh: bool = False,
+        fast: bool = False,
     ):
         self.path = Path(path)
         # self.dev_id = dev_id
         self.entitlements = entitlements
         self.package_as = package_as
+        self.force = force
+        self.fast = fast
         self.dev_id = dev_id
-        self._cmd_codesign = [
-            "codesign",
-            "--sign",
-            # "'{self.authority}'",
-            (repr(self.authority)
-             if (self.authority and self.authority != "-") else "-"),
-            "--timestamp",
-            "--deep",
-        ]
         self.log = logging.getLogger(self.__class__.__name__)
         self.cmd = ShellCmd(self.log)
+        self.identity = self.resolve_identity()
+        self._resource_index: dict[str, dict[str, list[Path]]] = {}
+        self._sizes: collections.Counter[Path] = collections.Counter()
+        self.cache_name = f"codesign-{self.appname}.json"
+        self.cache = {} if fresh else load_cache(self.cache_name)
+        self._signed: dict[str, str] = {}  # cache entries confirmed this run
+        self._dirty: set[Path] = set()  # containers of resources signed this run
+        self._cmd_codesign = ("codesign", "--sign", self.identity, "--timestamp")
+        self._signature = self.identity
+        if fast:
+            # development builds: no secure timestamp and sha1-only digests.
+            # Not notarizable, so cached separately from release signatures,
+            # which `is_signed_by_authority` never mistakes them for.
+            self._cmd_codesign = (
+                "codesign",
+                "--sign",
+                self.identity,
+                "--timestamp=none",
+                "--digest-algorithm=sha1",
+            )
+            self._signature = f"{self.identity} (fast)"
+        keychain = os.getenv("KEYCHAIN")
+        if keychain:
+            # workers then never search (or prompt for) other keychains
+            self._cmd_codesign += ("--keychain", keychain)
 
     def __repr__(self):
         return f"<{self.__class__.__name__}>"
@@ -238,7 +417,7 @@ class CodeSigner:
         """helper utility to get suffix differentiated path."""
         return self.path.parent / f"{self.path.stem}.{suffix}"
 
-    @property
+    @cached_property
     def authority(self) -> str:
         """authority includes developer id"""
         if self.dev_id and self.dev_id != "-":
@@ -246,22 +425,55 @@ class CodeSigner:
         else:
             return "-"
 
-    @property
+    @cached_property
     def appname(self) -> str:
         """derives lower-case app name from standalone name <appname>.app"""
         return self.path.stem.lower()
 
-    @property
+    def resolve_identity(self) -> str:
+        """resolve the signing authority to its certificate's SHA-1 hash.
+
+        Signing by hash spares each codesign process its own keychain lookup
+        by name. Falls back to the authority name if no match is found.
+        """
+        if self.authority == "-":
+            return "-"
+        try:
+            res = self.cmd.cmd_output(
+                ["security", "find-identity", "-v", "-p", "codesigning"]
+            )
+        except (OSError, subprocess.CalledProcessError):
+            return self.authority
+        # certificate names usually end with the team id, e.g. "... (ABCDE12345)"
+        pattern = rf'([0-9A-F]{{40}}) "{re.escape(self.authority)}( \([0-9A-Z]+\))?"'
+        match = re.search(pattern, res)
+        return match.group(1) if match else self.authority
+
+    def unlock_keychain(self):
+        """unlock the signing keychain once, before signing starts.
+
+        Uses $KEYCHAIN_PASSWORD and $KEYCHAIN (default: login.keychain-db).
+        """
+        password = os.getenv("KEYCHAIN_PASSWORD")
+        if not password:
+            return
+        keychain = os.getenv("KEYCHAIN", "login.keychain-db")
+        self.log.info("unlocking keychain: %s", keychain)
+        subprocess.run(
+            ["security", "unlock-keychain", "-p", password, keychain], check=True
+        )
+
+    @cached_property
     def zip_path(self) -> Path:
         """zip path"""
         return self._suffix_path("zip")
 
-    @property
+    @cached_property
     def pkg_path(self) -> Path:
         """pkg path"""
         return self._suffix_path("pkg")
 
-    @property
+    @cached_property
     def dmg_path(self) -> Path:
         """dmg path"""
         return self._suffix_path("dmg")
@@ -282,49 +494,278 @@ class CodeSigner:
             "satisfies its Designated Requirement" in res
         )
 
+    def collect(self, subpath: str) -> dict[str, list[Path]]:
+        """collect signable resources under a bundle subpath by extension.
+
+        A single traversal serves all extensions, and is memoized per subpath
+        so that re-running a group (e.g. after a failure) skips the walk.
+        """
+        if subpath in self._resource_index:
+            return self._resource_index[subpath]
+        resources: dict[str, list[Path]] = {ext: [] for ext in self.EXTENSIONS}
+        for path in self.iter_resources(subpath):
+            resources[path.suffix].append(path)
+        self._resource_index[subpath] = resources
+        return resources
+
+    def iter_resources(self, subpath: str) -> Iterator[Path]:
+        """lazily yield signable resources under a bundle subpath.
+
+        Symlinks are skipped using the type information scandir already
+        holds for each entry, rather than an lstat per path, and each name is
+        matched with a single set lookup on its extension. The size of every
+        file inside a resource is added to each of its enclosing resources
+        (see `cost`) in the same walk.
+        """
+        suffixes = frozenset(ext.lstrip(".") for ext in self.EXTENSIONS)
+        # pending folders, each with the resources enclosing it
+        stack: list[tuple[str, tuple[Path, ...]]] = [(str(self.path / subpath), ())]
+        while stack:
+            folder, enclosing = stack.pop()
+            try:
+                entries = os.scandir(folder)
+            except FileNotFoundError:
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.is_symlink():
+                        continue
+                    _, dot, ext = entry.name.rpartition(".")
+                    owners = enclosing
+                    if dot and ext in suffixes:
+                        path = Path(entry.path)
+                        yield path
+                        self._sizes[path] = 0
+                        owners = (*enclosing, path)
+                    if entry.is_dir():
+                        stack.append((entry.path, owners))
+                    elif owners:
+                        size = entry.stat(follow_symlinks=False).st_size
+                        for owner in owners:
+                            self._sizes[owner] += size
+
     def sign_group(self, category: str, subpath: str):
         """used to collect and codesign items in a bundle subpath"""
-        resources = []
-        for ext in ["mxo", "framework", "dylib", "bundle"]:
-            resources.extend(
-                [
-                    i
-                    for i in self.path.glob(subpath.format(ext=ext))
-                    if not i.is_symlink()
-                ]
-            )
+        resources = list(itertools.chain.from_iterable(self.collect(subpath).values()))
 
         self.log.info("%s : %s found", category, len(resources))
 
-        for resource in resources:
-            self.log.info("%s: %s", category, resource)
-            res = subprocess.run(
-                self._cmd_codesign + ["-f", resource],
-                capture_output=True,
-                encoding="utf8",
-                check=True,
+        try:
+            self._sign_all(category, resources)
+        finally:
+            save_cache(self.cache_name, self._signed)
+
+    def _sign_all(self, category: str, resources: list[Path]):
+        """sign resources, each once all of its nested resources are signed"""
+        # nested resources must be sealed before their containers, so each
+        # resource is dispatched as soon as everything nested inside it has
+        # been signed; a slow resource only holds back its own containers.
+        # Ready resources are signed concurrently in batches (codesign accepts
+        # many paths per invocation) to amortize startup and keychain access.
+        parents = self.nesting(resources)
+        pending = collections.Counter(parents.values())
+        ready = [resource for resource in resources if not pending[resource]]
+        futures: dict[Future, list[Path]] = {}
+        failures: dict[Path, str] = {}
+        progressbar = get_progressbar()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool, progressbar(
+            total=len(resources), desc=category, unit="file", disable=not resources
+        ) as pbar:
+            while ready or futures:
+                # codesign time is dominated by hashing, so dispatch the
+                # largest resources first to minimize the total wall time
+                ready.sort(key=self.cost, reverse=True)
+                for batch in self.batches(ready):
+                    futures[pool.submit(self._sign, batch)] = batch
+                ready = []
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch = futures.pop(future)
+                    pbar.update(len(batch))
+                    try:
+                        future.result()
+                    except subprocess.CalledProcessError as e:
+                        # keep signing independent resources, but not the
+                        # containers of a failed batch
+                        stderr = (e.stderr or b"").decode("utf8", "replace")
+                        errors = self.attribute_errors(batch, stderr)
+                        failures.update(errors or dict.fromkeys(batch, stderr.strip()))
+                        continue
+                    if progressbar is NullProgressbar:
+                        for resource in batch:
+                            self.log.info("%s: %s", category, resource)
+                    for resource in batch:
+                        if resource in parents:
+                            parent = parents[resource]
+                            pending[parent] -= 1
+                            if not pending[parent]:
+                                ready.append(parent)
+        if failures:
+            self.log.critical(
+                "%s: %d failed to sign\n%s",
+                category,
+                len(failures),
+                "\n".join(f"{path}: {message}" for path, message in failures.items()),
             )
-            if res.returncode != 0:
-                self.log.critical(res.stderr)
+            raise RuntimeError(f"{category}: {len(failures)} resources failed to sign")
+
+    @staticmethod
+    def attribute_errors(paths: list[Path], stderr: str) -> dict[Path, str]:
+        """map codesign's '<path>: <message>' error lines to batch paths"""
+        targets = {str(path): path for path in paths}
+        errors = {}
+        for line in (stderr or "").splitlines():
+            target, sep, message = line.partition(": ")
+            if sep and target in targets and message != "replacing existing signature":
+                errors[targets[target]] = message
+        return errors
+
+    @staticmethod
+    def nesting(resources: list[Path]) -> dict[Path, Path]:
+        """map each nested resource to its nearest enclosing resource"""
+        signable = set(resources)
+        parents = {}
+        for resource in resources:
+            for parent in resource.parents:
+                if parent in signable:
+                    parents[resource] = parent
+                    break
+        return parents
+
+    def batches(self, paths: list[Path]) -> Iterator[list[Path]]:
+        """partition paths into batches for single codesign invocations.
+
+        Batches are sized to spread a few paths across all workers, and are
+        capped at `batch_size` paths and `batch_arg_bytes` of argv (ARG_MAX).
+        Paths are dealt round-robin, so for paths sorted by descending cost
+        every batch gets a similar share of the work, and the batch holding
+        the costliest path comes first (longest-processing-time first).
+        """
+        workers = self.max_workers or 1
+        size = max(1, min(self.batch_size, -(-len(paths) // workers)))
+        nbatches = -(-len(paths) // size)
+        for start in range(nbatches):
+            batch: list[Path] = []
+            nbytes = 0
+            for path in paths[start::nbatches]:
+                arg_bytes = len(os.fsencode(path)) + 1
+                if batch and nbytes + arg_bytes > self.batch_arg_bytes:
+                    yield batch
+                    batch, nbytes = [], 0
+                batch.append(path)
+                nbytes += arg_bytes
+            if batch:
+                yield batch
+
+    def cost(self, path: Path) -> int:
+        """approximate signing cost of a resource: its size in bytes, as
+        recorded by the walk in `iter_resources`"""
+        if path in self._sizes:
+            return self._sizes[path]
+        return dir_size(path) if path.is_dir() else path.stat().st_size
+
+    def is_signed_by_authority(self, path: Path) -> bool:
+        """check if path has a valid signature from the signing authority.
+
+        Release runs also require a secure timestamp, so that a signature
+        left by a `fast` run is re-signed rather than shipped.
+        """
+        if self.authority == "-":
+            return False
+        if not self.fast and not self.has_secure_timestamp(path):
+            return False
+        res = subprocess.run(
+            [*self._cmd_verify, str(path)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        return res.returncode == 0
 
-    def sign_runtime(self):
-        """codesign bundle runtime."""
-        self.log.info("signing runtime: %s", self.path)
+    @staticmethod
+    def has_secure_timestamp(path: Path) -> bool:
+        """check if path's signature carries a secure (notarizable) timestamp"""
         res = subprocess.run(
-            self._cmd_codesign
-            + [
-                "--options",
-                "runtime",
-                "--entitlements",
-                str(self.entitlements),
-                str(self.path),
-            ],
-            capture_output=True,
-            encoding="utf8",
+            ["codesign", "--display", "--verbose=2", str(path)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+        # `codesign -d` reports 'Signed Time=' instead when unstamped
+        return res.returncode == 0 and b"\nTimestamp=" in res.stderr
+
+    @cached_property
+    def _cmd_verify(self) -> tuple[str, ...]:
+        """codesign verification against the signing authority's requirement"""
+        requirement = (
+            "anchor apple generic and "
+            f'certificate leaf[subject.CN] = "{self.authority}*"'
+        )
+        return ("codesign", "--verify", "--strict", f"-R={requirement}")
+
+    def _cache_key(self, path: Path) -> str:
+        """cache key of a resource: bundle-relative path and a stamp, which is
+        mtime and size for files, or a fingerprint of every entry for bundles
+        (whose own mtime misses changes nested inside them)"""
+        if path.is_dir():
+            return f"{path.relative_to(self.path)}:{bundle_fingerprint(path)}"
+        stat = path.stat()
+        return f"{path.relative_to(self.path)}:{stat.st_mtime_ns}:{stat.st_size}"
+
+    def _sign(self, paths: list[Path]):
+        """codesign paths in a single codesign invocation.
+
+        Unless `force` is set, paths signed by this identity in a previous
+        run and unchanged since, or already validly signed by the signing
+        authority, are skipped; containers of resources signed in this run
+        are always re-sealed.
+        """
+        if not self.force:
+            unsigned = []
+            for path in paths:
+                key = self._cache_key(path)
+                if path not in self._dirty and (
+                    self.cache.get(key) == self._signature
+                    or self.is_signed_by_authority(path)
+                ):
+                    self._signed[key] = self._signature
+                else:
+                    unsigned.append(path)
+            paths = unsigned
+            if not paths:
+                return
+        subprocess.run(
+            [*self._cmd_codesign, "-f", *map(str, paths)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
             check=True,
         )
-        if res.returncode != 0:
-            self.log.critical(res.stderr)
+        for path in paths:
+            self._signed[self._cache_key(path)] = self._signature
+            self._dirty.update(path.parents)
+
+    def sign_runtime(self):
+        """codesign bundle runtime.
+
+        Nested code has already been signed inside-out by `sign_group`, so
+        only the bundle itself is signed here (no --deep).
+        """
+        self.log.info("signing runtime: %s", self.path)
+        try:
+            subprocess.run(
+                [
+                    *self._cmd_codesign,
+                    "--options",
+                    "runtime",
+                    "--entitlements",
+                    str(self.entitlements),
+                    str(self.path),
+                ],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                check=True,
+            )
+        except subprocess.CalledProcessError as e:
+            self.log.critical(e.stderr.decode("utf8", "replace"))
+            raise
 
     def dmg(self, src: Path, dst: Path, volname: Optional[str] = None):
         """create a dmg archive.
@@ -335,15 +776,33 @@ class CodeSigner:
             volname = f"{src.stem}Installer"
         assert src.suffix in [".app", ".pkg"], "Expects an '.app' or '.pkg' src param."
         self.log.info("creating %s", dst)
-        self.cmd(
-            f"hdiutil create -volname '{volname}' -srcfolder '{src}' "
-            f"-ov -format UDZO '{dst}'"
+        self.cmd.run(
+            [
+                "hdiutil",
+                "create",
+                "-volname",
+                volname,
+                "-srcfolder",
+                src,
+                "-ov",
+                "-format",
+                "UDZO",
+                dst,
+            ]
         )
         self.log.info("codesigning %s", dst)
-        self.cmd(
-            f"codesign --deep --force --verify --verbose "
-            f"--sign '{self.authority}' "
-            f"--options runtime '{dst}'"
+        self.cmd.run(
+            [
+                "codesign",
+                "--force",
+                "--verify",
+                "--verbose",
+                "--sign",
+                self.identity,
+                "--options",
+                "runtime",
+                dst,
+            ]
         )
 
     def pkg(self, src: Path, dst: Path):
@@ -352,9 +811,16 @@ class CodeSigner:
         Expects a standalone.app as a 'src' parameter.
         """
         assert src.suffix == ".app", "Expects an appbundle as a 'src' param."
-        self.cmd(
-            f"productbuild --sign '{self.authority}' "
-            f"--component {src} /Applications {dst}"
+        self.cmd.run(
+            [
+                "productbuild",
+                "--sign",
+                self.authority,
+                "--component",
+                src,
+                "/Applications",
+                dst,
+            ]
         )
 
     def process(self) -> Path:
@@ -363,8 +829,9 @@ class CodeSigner:
             gen = Generator(self.appname)
             self.entitlements = gen.generate_entitlements()
         self.entitlements = Path(self.entitlements).absolute()
-        self.sign_group("externals", "Contents/Resources/C74/**/*.{ext}")
-        self.sign_group("frameworks", "Contents/Frameworks/**/*.{ext}")
+        self.unlock_keychain()
+        self.sign_group("externals", "Contents/Resources/C74")
+        self.sign_group("frameworks", "Contents/Frameworks")
         self.sign_runtime()
         self.log.info("%s codesigning DONE", self.appname)
         if self.package_as == "pkg":
@@ -380,7 +847,8 @@ class CodeSigner:
             self.dmg(self.path, self.dmg_path)
             return self.dmg_path
         self.log.info("zipping signed %s for notarization", self.path)
-        self.cmd.zip(self.path, self.zip_path)
+        # transport-only archive: favour speed over size
+        self.cmd.zip(self.path, self.zip_path, compression=1)
         return self.zip_path
 
 
@@ -390,21 +858,37 @@ class Notarizer:
     standalone.notarize(a-signed.zip)
         -> a-notarized.zip
         -> output_dir/a-notarized.app
+
+    Several artifacts (e.g. a .dmg and a .pkg) may be given at once, in
+    which case they are submitted to the notary service concurrently.
     """
 
+    FINAL_STATUSES = ["Accepted", "Invalid", "Rejected"]
+    CACHE = "notarize.json"  # sha256 of artifact -> accepted submission id
+
     def __init__(
         self,
-        path: Path | str,
+        path: Path | str | Sequence[Path | str],
         apple_id: str,
         app_password: str,
         app_bundle_id: str,
         output_dir: str = "output",
+        team_id: Optional[str] = None,
+        timeout: int = 3600,
+        staple: bool = False,
     ):
-        self.path = Path(path)
-        self.apple_id = apple_id
-        self.app_password = app_password
-        self.app_bundle_id = app_bundle_id
+        if isinstance(path, (str, Path)):
+            path = [path]
+        self.paths = [Path(p) for p in path]
+        self.path = self.paths[0]
+        self.apple_id = apple_id or os.getenv("APPLE_ID")
+        self.app_password = app_password or os.getenv("APP_PASSWORD")
+        self.app_bundle_id = app_bundle_id or os.getenv("APP_BUNDLE_ID")
         self.output_dir = Path(output_dir)
+        self.team_id = team_id or os.getenv("TEAM_ID")
+        self.timeout = timeout
+        self.staple = staple
+        self.cache = load_cache(self.CACHE)
         self.log = logging.getLogger(self.__class__.__name__)
         self.cmd = ShellCmd(self.log)
 
@@ -419,52 +903,228 @@ class Notarizer:
         )
         return ("accepted" in res) and ("source=Notarized Developer ID" in res)
 
-    def notarize(self):
-        """notarize using altool (for xcode < 13)."""
-        self.log.info("notarizing %s", self.path)
+    def _credentials(self) -> list[str]:
+        """notarytool authentication options"""
+        return [
+            "--apple-id",
+            self.apple_id,
+            "--password",
+            self.app_password,
+            "--team-id",
+            str(self.team_id),
+        ]
 
-        res = self.cmd.cmd_output(
-            [
-                "xcrun",
-                "altool",
-                "--notarize-app",
-                "--file",
-                str(self.path),
-                "-t",
-                "osx",
-                "-u",
-                self.apple_id,
-                "-p",
-                self.app_password,
-                "-primary-bundle-id",
-                self.app_bundle_id,
-            ]
+    async def _notarytool(self, *args: str, timeout: Optional[float] = None):
+        """run `xcrun notarytool <args>` returning (returncode, json_result)"""
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        proc = await asyncio.create_subprocess_exec(
+            "xcrun",
+            "notarytool",
+            *args,
+            *self._credentials(),
+            "--output-format",
+            "json",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise
+        try:
+            result = json.loads(stdout)
+        except ValueError:
+            result = {"message": stderr.decode("utf8") or stdout.decode("utf8")}
+        return proc.returncode, result
+
+    async def _poll(self, submission_id: str) -> dict[str, Any]:
+        """poll submission status until final.
+
+        Transient failures (network errors, throttling) are logged and
+        retried with exponential backoff until `self.timeout` expires.
+        """
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        deadline = time.monotonic() + self.timeout
+        delay = 15
+        while time.monotonic() < deadline:
+            try:
+                returncode, result = await self._notarytool(
+                    "info", submission_id, timeout=60
+                )
+                if returncode == 0 and result.get("status") in self.FINAL_STATUSES:
+                    return result
+                self.log.info(
+                    "%s: %s", submission_id, result.get("status") or result.get("message")
+                )
+            except asyncio.TimeoutError:
+                self.log.warning("%s: status request timed out", submission_id)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 120)
+        raise TimeoutError(
+            f"submission {submission_id} not final after {self.timeout}s"
         )
-        if "No errors uploading" not in res:
-            self.log.critical(res)
-            sys.exit()
-        else:
-            self.log.info(res)
 
-    def process(self) -> Path:
-        """notarize zipped standalone.app"""
-        assert self.path.suffix in [".zip", ".pkg", ".dmg"]
-        self.notarize()
-        if self.path.suffix == ".pkg":
+    def _staple_target(self, path: Path) -> Path:
+        """stapleable product of a notarized path"""
+        if path.suffix == ".zip":
+            return path.parent / f"{path.stem}.app"
+        return path
+
+    async def _is_stapled(self, target: Path) -> bool:
+        """check, without modifying it, if target has a valid stapled ticket"""
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        if not target.exists():
+            return False
+        proc = await asyncio.create_subprocess_exec(
+            "xcrun",
+            "stapler",
+            "validate",
+            str(target),
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        return await proc.wait() == 0
+
+    async def _staple(self, target: Path):
+        """staple notarization ticket to target"""
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        self.log.info("stapling %s", target)
+        proc = await asyncio.create_subprocess_exec(
+            "xcrun",
+            "stapler",
+            "staple",
+            "-v",
+            str(target),
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        _, stderr = await proc.communicate()
+        if proc.returncode != 0:
+            raise RuntimeError(f"stapling {target} failed: {stderr.decode('utf8')}")
+
+    async def _notarize_one(self, path: Path) -> dict[str, Any]:
+        """submit a single artifact and wait for its final status.
+
+        Artifacts whose contents match a previously accepted submission, or
+        which already carry a valid stapled ticket, are not resubmitted. If
+        `staple` is set, each artifact is stapled as soon as its own
+        submission is accepted, while other submissions are still pending.
+        Stapling a .dmg or .pkg rewrites it, so its stapled digest is cached
+        too.
+        """
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        staple_target = self._staple_target(path)
+        digest = await asyncio.to_thread(file_digest, path)
+        submission_id = self.cache.get(digest)
+        if submission_id is None and staple_target == path:
+            if await self._is_stapled(path):
+                submission_id = self.cache[digest] = "stapled"
+        if submission_id is not None:
+            self.log.info("%s unchanged since submission %s", path.name, submission_id)
+            if self.staple and not await self._is_stapled(staple_target):
+                await self._staple_cached(path, staple_target, submission_id)
+            return {"id": submission_id, "status": "Accepted", "message": "cached"}
+        self.log.info("notarizing %s", path)
+        returncode, result = await self._notarytool("submit", str(path), "--wait")
+        submission_id = result.get("id")
+        if not submission_id:
+            raise RuntimeError(result.get("message"))
+        self.log.info("%s submission id: %s", path.name, submission_id)
+        if returncode != 0 or result.get("status") not in self.FINAL_STATUSES:
+            # `--wait` was interrupted: keep polling the submission instead
+            result = await self._poll(submission_id)
+        if result.get("status") != "Accepted":
+            raise RuntimeError(
+                f"notarization {result.get('status')}: {result.get('message')} "
+                f"(see `xcrun notarytool log {submission_id}`)"
+            )
+        self.cache[digest] = submission_id
+        if self.staple:
+            await self._staple_cached(path, staple_target, submission_id)
+        return result
+
+    async def _staple_cached(self, path: Path, target: Path, submission_id: str):
+        """staple target, caching path's new digest if stapling rewrote it"""
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        await self._staple(target)
+        if target == path:
+            self.cache[await asyncio.to_thread(file_digest, path)] = submission_id
+
+    async def _notarize_all(self) -> list[dict[str, Any] | BaseException]:
+        """submit all artifacts concurrently."""
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        return await asyncio.gather(
+            *[self._notarize_one(p) for p in self.paths], return_exceptions=True
+        )
+
+    def notarize(self) -> dict[Path, dict[str, Any]]:
+        """notarize using notarytool (xcode >= 13).
+
+        `notarytool submit --wait` blocks until the notary service returns a
+        final status, so submission and polling happen in a single call.
+        """
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        if not self.apple_id:
+            raise ValueError("apple_id (or APPLE_ID env var) is required by notarytool")
+        if not self.app_password:
+            raise ValueError(
+                "app_password (or APP_PASSWORD env var) is required by notarytool"
+            )
+        if not self.team_id:
+            raise ValueError("team_id (or TEAM_ID env var) is required by notarytool")
+        results = asyncio.run(self._notarize_all())
+        save_cache(self.CACHE, self.cache)
+        accepted: dict[Path, dict[str, Any]] = {}
+        failures: dict[Path, BaseException] = {}
+        for path, result in zip(self.paths, results):
+            if isinstance(result, BaseException):
+                self.log.critical("%s: %s", path.name, result)
+                failures[path] = result
+            else:
+                self.log.info("%s: %s", path.name, result.get("message"))
+                accepted[path] = result
+        if failures:
+            raise NotarizationError(failures)
+        return accepted
+
+    def notarized(self, path: Path) -> Path:
+        """post-notarization product of path"""
+        if path.suffix == ".pkg":
             self.log.info(".pkg installer notarized")
-            return self.path
-        if self.path.suffix == ".dmg":
+            return path
+        if path.suffix == ".dmg":
             self.log.info(".dmg archive notarized")
-            return self.path
+            return path
         # else .zip
         self.log.info("app notarized")
         self.log.info("removing zip used for notarization")
-        self.cmd("rm {self.path}")
+        self.cmd.remove(path)
         self.log.info(".app will be processed for stapling")
-        signed_app = self.path.parent / f"{self.path.stem}.app"
+        signed_app = path.parent / f"{path.stem}.app"
         assert signed_app.exists(), "signed app not available"
         return signed_app
 
+    def process_all(self) -> list[Path]:
+        """notarize all given artifacts"""
+        for path in self.paths:
+            assert path.suffix in [".zip", ".pkg", ".dmg"]
+        self.notarize()
+        return [self.notarized(p) for p in self.paths]
+
+    def process(self) -> Path:
+        """notarize zipped standalone.app"""
+        return self.process_all()[0]
+
 
 class Stapler:
     """standalone stapler class
@@ -484,7 +1144,7 @@ class Stapler:
     def staple(self):
         """staple successful notarization to app.bundle"""
         self.log.info("stapling %s", self.path)
-        self.cmd(f"xcrun stapler staple -v {self.path}")
+        self.cmd.run(["xcrun", "stapler", "staple", "-v", self.path])
 
     def process(self) -> Path:
         """stapling process"""
@@ -499,45 +1159,85 @@ class Distributor:
         -> a-packaged.zip
     """
 
-    FORMATS = set(["app", "pkg", "dmg"])
+    FORMATS = set([".app", ".pkg", ".dmg"])
 
-    def __init__(self, path: Path | str, dev_id: str, version: str, arch: str):
+    def __init__(
+        self,
+        path: Path | str,
+        dev_id: Optional[str],
+        version: str,
+        arch: str,
+        parallel_compress: bool = False,
+        extra_files: Optional[list[str | Path]] = None,
+    ):
         self.path = Path(path)
         self.dev_id = dev_id
         self.version = version
         self.arch = arch
+        self.extra_files = [Path(f) for f in extra_files or []]
+        import datetime  # pylint: disable=import-outside-toplevel
+
         self.timestamp = datetime.date.today().strftime("%y%m%d")
         self.log = logging.getLogger(self.__class__.__name__)
         self.cmd = ShellCmd(self.log)
         assert self.path.suffix in self.FORMATS, f"must one of {self.FORMATS}"
+        self.parallel_compress = parallel_compress and bool(shutil.which("pigz"))
+        if parallel_compress and not self.parallel_compress:
+            self.log.warning("pigz not found: falling back to zip")
 
     def __repr__(self):
         return f"<{self.__class__.__name__}>"
 
-    @property
+    @cached_property
     def appname(self) -> str:
         """derives lower-case app name from standalone name <appname>.app"""
         return self.path.stem.lower()
 
-    @property
+    @cached_property
     def release_name(self) -> str:
         """name with version, datestamp and architecture"""
         return f"{self.appname}-{self.version}-{self.arch}"
 
-    @property
+    @cached_property
     def product(self) -> Path:
         """final preprocessed codesigned notarized stapled packaged product!"""
-        return Path(f"{self.release_name}.{self.path.suffix}")
+        if self.path.suffix == ".dmg":
+            return self.path.parent / f"{self.release_name}.dmg"
+        if self.parallel_compress:
+            return Path(f"{self.release_name}.tgz")
+        return Path(f"{self.release_name}.zip")
 
     def package(self):
-        """package .app or folder containing .app w/ related files."""
-        suffix = self.path.suffix
-        if suffix == ".app":
-            self.cmd.zip(self.path, self.product)
-        if suffix == ".pkg":
+        """package .app or folder containing .app w/ related files.
+
+        With `parallel_compress`, a tarball is compressed with pigz across
+        all cores instead of ditto's single-threaded zip. Extra files are
+        added at the top level of the archive.
+        """
+        if self.path.suffix == ".dmg":
+            if self.extra_files:
+                self.log.warning("extra files cannot be added to a dmg")
+            self.path.rename(self.product)
+        elif self.parallel_compress:
+            members: list[str | Path] = ["-C", self.path.parent, self.path.name]
+            for extra in self.extra_files:
+                members += ["-C", extra.parent, extra.name]
+            self.cmd.run(
+                [
+                    "tar",
+                    "--use-compress-program",
+                    "pigz",
+                    "-cf",
+                    self.product,
+                    *members,
+                ]
+            )
+        else:
             self.cmd.zip(self.path, self.product)
-        if suffix == ".dmg":
-            self.path.rename(self.path.parent / f"{self.release_name}.{suffix}")
+            if self.extra_files:
+                with zipfile.ZipFile(self.product, "a", zipfile.ZIP_DEFLATED) as archive:
+                    for extra in self.extra_files:
+                        archive.write(extra, extra.name)
 
     def process(self) -> Path:
         """final codesigned, notarized standalone packaging process."""
@@ -549,6 +1249,8 @@ class Distributor:
 class Standalone:
     """Main class integrating operations of all other process classes."""
 
+    CACHE = "pipeline.json"
+
     def __init__(
         self,
         path: Path | str,
@@ -561,6 +1263,8 @@ class Standalone:
         arch: str = "dual",
         remove_attrs: bool = False,
         norm_perms: bool = False,
+        team_id: Optional[str] = None,
+        include: Optional[list[str]] = None,
     ):
         self.path = Path(path)
         self.version = version or "0.0.1"
@@ -568,10 +1272,12 @@ class Standalone:
         self.apple_id = apple_id or os.getenv("APPLE_ID", "bugs.bunny@icloud.com")
         self.app_password = app_password or os.getenv("APP_PASSWORD", "1234")
         self.app_bundle_id = app_bundle_id or os.getenv("APP_BUNDLE_ID", "com.example.app")
+        self.team_id = team_id or os.getenv("TEAM_ID")
         self.method = method
         self.arch = arch
         self.remove_attrs = remove_attrs
         self.norm_perms = norm_perms
+        self.include = include or []
         self.log = logging.getLogger(self.__class__.__name__)
         self.cmd = ShellCmd(self.log)
 
@@ -579,12 +1285,40 @@ class Standalone:
         return f"<{self.__class__.__name__}>"
 
     def process(self) -> Path | str:
-        """main automated process"""
-        return {
-            "zip": self.process_as_zip(),
-            "pkg": self.process_as_pkg(),
-            "dmg": self.process_as_dmg(),
-        }[self.method]
+        """main automated process
+
+        Skipped if the bundle is unchanged since the last completed run with
+        the same settings and that run's product still exists.
+        """
+        # every setting which affects the product
+        key = json.dumps(
+            [
+                str(self.path.resolve()),
+                self.method,
+                self.arch,
+                self.version,
+                self.dev_id,
+                self.team_id,
+                self.app_bundle_id,
+                self.remove_attrs,
+                self.norm_perms,
+                self.include,
+            ]
+        )
+        pipeline = load_cache(self.CACHE)
+        if key in pipeline:
+            fingerprint, product = pipeline[key]
+            if Path(product).exists() and bundle_fingerprint(self.path) == fingerprint:
+                self.log.info("%s unchanged: reusing %s", self.path, product)
+                return Path(product)
+        product = {
+            "zip": self.process_as_zip,
+            "pkg": self.process_as_pkg,
+            "dmg": self.process_as_dmg,
+        }[self.method]()
+        pipeline[key] = [bundle_fingerprint(self.path), str(Path(product).resolve())]
+        save_cache(self.CACHE, pipeline)
+        return product
 
     def preprocess(self) -> Path:
         """preprocess standalone"""
@@ -599,12 +1333,19 @@ class Standalone:
     def notarize(self, signed_container: Path) -> Path:
         """notarize signed container"""
         return Notarizer(
-            signed_container, self.apple_id, self.app_password, self.app_bundle_id
+            signed_container,
+            self.apple_id,
+            self.app_password,
+            self.app_bundle_id,
+            team_id=self.team_id,
+            staple=True,
         ).process()
 
     def distribute(self, output_dir: Path) -> Path:
         """distribute signed standalone"""
-        return Distributor(output_dir, self.dev_id, self.version, self.arch).process()
+        return Distributor(
+            output_dir, self.dev_id, self.version, self.arch, extra_files=self.include
+        ).process()
 
     def process_as_zip(self) -> Path:
         """zip automated process"""
@@ -639,6 +1380,8 @@ class Standalone:
             cfg["apple_id"],
             cfg["app_password"],
             cfg["app_bundle_id"],
-            cfg["arch"],
-            cfg["pre_clean"],
+            arch=cfg["arch"],
+            remove_attrs=cfg["pre_clean"],
+            team_id=cfg.get("team_id"),
+            include=cfg.get("include"),
         )
@@ -14,6 +14,8 @@ import os
 import pathlib
 import subprocess
 
+from maxutils.shell import dir_size, format_size
+
 
 DEBUG = True
 
@@ -35,19 +37,19 @@ class Shrink:
         self.targets = []
         self.log = logging.getLogger(self.__class__.__name__)
 
-    def _cmd(self, shellcmd, *args, **kwds):
-        """run system command"""
-        syscmd = shellcmd.format(*args, **kwds)
-        self.log.debug(syscmd)
-        os.system(syscmd)
+    def _cmd(self, argv, check=True):
+        """run command from an argument list, without an intermediary shell"""
+        argv = [str(arg) for arg in argv]
+        self.log.debug(" ".join(argv))
+        subprocess.run(argv, check=check)
 
     def _cmd_output(self, arglist):
         """capture and return shell _cmd output."""
-        return subprocess.check_output(arglist).decode("utf8")
+        return subprocess.check_output(arglist, encoding="utf8")
 
     def _get_size(self):
         """get total size of target path"""
-        return self._cmd_output(["du", "-s", "-h", self.path]).strip()
+        return format_size(dir_size(self.path))
 
     def is_binary(self, path):
         """returns True if file is a binary file."""
@@ -63,8 +65,8 @@ class Shrink:
     def remove_arch(self, path):
         """removes arch from fat binary"""
         tmp = path.parent / f'{path.name}__tmp'
-        self._cmd(f"lipo -remove '{self.arch}' '{path}' -output '{tmp}'")
-        self._cmd(f"mv '{tmp}' '{path}'")
+        self._cmd(["lipo", "-remove", self.arch, path, "-output", tmp])
+        os.replace(tmp, path)
 
     def collect(self):
         """build up a list of target binaries"""
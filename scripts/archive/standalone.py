@@ -10,18 +10,25 @@ import argparse
 import logging
 import os
 import plistlib
+import shlex
+import shutil
 import subprocess
 import json
+import zipfile
+from functools import cached_property
 from pathlib import Path
 
-try:
-    import tqdm
-
-    HAVE_PROGRESSBAR = True
-    progressbar = tqdm.tqdm
-except ImportError:
-    HAVE_PROGRESSBAR = False
-    progressbar = lambda x: x  # noop
+from maxutils import notary
+from maxutils.shell import (
+    MacShellCmd,
+    dir_size,
+    file_digest,
+    format_size,
+    load_cache,
+    save_cache,
+    write_if_changed,
+)
+from maxutils.standalone import CodeSigner, PreProcessor
 
 DEBUG = False
 
@@ -54,8 +61,10 @@ CONFIG = {
     }
 }
 
-# ----------------------------------------------------------------------------
-# UTILITY FUNCTIONS
+# pre-serialized forms of the static defaults above (XML: codesign does not
+# accept binary entitlements plists)
+ENTITLEMENTS_PLIST: bytes = plistlib.dumps(CONFIG["entitlements"])
+CONFIG_JSON: bytes = json.dumps(CONFIG, indent=2).encode("utf8")
 
 # ----------------------------------------------------------------------------
 # MAIN CLASS
@@ -77,22 +86,24 @@ class MaxStandalone:
         pre_clean=False,
         arch=None,
         dry_run=False,
+        team_id: str = None,
     ):
         self.path = Path(path)
         self.dev_id = dev_id
         self.entitlements = entitlements
         self.output_dir = Path(output_dir)
-        self.appleid = appleid
+        self.appleid = appleid or os.getenv("APPLE_ID")
         self.app_version = app_version
-        self.app_password = app_password
+        self.app_password = app_password or os.getenv("APP_PASSWORD")
         self.app_bundle_id = app_bundle_id
         self.pre_clean = pre_clean
         self.arch = arch or "dual"
         self.dry_run = dry_run
+        self.team_id = team_id or os.getenv("TEAM_ID")
 
         self.log = logging.getLogger(self.__class__.__name__)
 
-    @property
+    @cached_property
     def authority(self):
         """authority string required by codesigning"""
         if self.dev_id:
@@ -100,175 +111,222 @@ class MaxStandalone:
         self.log.critical("Developer ID not set (dev_id)")
         raise ValueError
 
-    @property
+    @cached_property
     def appname(self):
         """derives lower-case app name from standalone name <appname>.app"""
         return self.path.stem.lower()
 
-    @property
-    def cmd_codesign(self):
-        """common prefix for group codesigning"""
-        return ["codesign", "-s", self.authority, "--timestamp", "--deep"]
-
-    @property
+    @cached_property
     def app_path(self):
         """output app path"""
         return self.output_dir / self.path.name
 
-    @property
+    @cached_property
     def zip_path(self):
         """output zip path"""
         zipped = f'{self.path.stem}.zip'
         return self.output_dir / zipped
 
-    def cmd(self, shellcmd, *args, **kwds):
-        """run system command"""
-        syscmd = shellcmd.format(*args, **kwds)
-        self.log.debug(syscmd)
-        os.system(syscmd)
+    def cmd(self, argv, check=True):
+        """run command from an argument list, without an intermediary shell"""
+        argv = [str(arg) for arg in argv]
+        self.log.debug(" ".join(map(shlex.quote, argv)))
+        subprocess.run(argv, check=check)
 
     def cmd_output(self, arglist) -> str:
         """capture and return shell cmd output."""
-        return subprocess.check_output(arglist).decode("utf8")
+        return subprocess.check_output(arglist, encoding="utf8")
 
     def get_size(self, path=None) -> str:
-        """get total size of target path"""
-        if not path:
-            path = self.path
-        return self.cmd_output(["du", "-s", "-h", path]).strip()
+        """get total size of target path (symlinks not followed)"""
+        return format_size(dir_size(path or self.path))
 
     def clean(self):
         """cleanup detritus from bundle"""
-        self.cmd(f"xattr -cr {self.path}")
-
-    def shrink(self):
-        """recursively thins fat binaries in a given folder"""
+        self.cmd(["xattr", "-cr", self.path])
+
+    def clean_outside(self, subpaths):
+        """cleanup detritus from bundle, except within subpaths"""
+        keep = {self.path / subpath for subpath in subpaths}
+        ancestors = {parent for path in keep for parent in path.parents}
+        dirs, others = [], []
+        stack = [self.path]
+        while stack:
+            path = stack.pop()
+            dirs.append(path)
+            for child in path.iterdir():
+                if child in ancestors and not child.is_symlink():
+                    stack.append(child)
+                elif child not in keep:
+                    others.append(child)
+        self.cmd(["xattr", "-c", *dirs])
+        if others:
+            self.cmd(["xattr", "-cr", *others])
+
+    def shrink(self) -> tuple[int, int]:
+        """thins fat binaries in the bundle in place.
+
+        Returns the bundle size before and after: the single scan that
+        finds the fat binaries also measures the bundle, and the bytes
+        saved by thinning give the new size without walking it again.
+        """
         self.log.info("shrinking: %s", self.path)
-        tmp = self.path.parent / f'{self.path.name}__tmp'
-        self.log.info("START: %s", self.path)
-        self.cmd(f"ditto --arch '{self.arch}' '{self.path}' '{tmp}'")
-        self.cmd(f"rm -rf '{self.path}'")
-        self.cmd(f"mv '{tmp}' '{self.path}'")
+        preprocessor = PreProcessor(self.path, self.arch)
+        size, fat_binaries = preprocessor.scan()
+        return size, size - preprocessor.shrink(fat_binaries)
 
     def generate_entitlements(self, path=None) -> str:
-        """generates a default enttitelements.plist file"""
+        """generates a default enttitelements.plist file (if changed)"""
         if not path:
             path = f"{self.appname}-entitlements.plist"
-        with open(path, "wb") as fopen:
-            plistlib.dump(CONFIG["entitlements"], fopen)
+        write_if_changed(path, ENTITLEMENTS_PLIST)
         return path
 
     def generate_config(self, path=None) -> str:
         """generates a default entitlements.plist file"""
         if not path:
             path = f"{self.appname}.json"
-        with open(path, "w") as fopen:
-            json.dump(CONFIG, fopen, indent=2)
+        write_if_changed(path, CONFIG_JSON)
         return path
 
-    def sign_group(self, category, glob_subpath):
-        """used to collect and codesign items in a bundle subpath"""
-        resources = []
-        for ext in ["mxo", "framework", "dylib", "bundle"]:
-            resources.extend(
-                [
-                    i for i in self.path.glob(glob_subpath.format(ext=ext))
-                    if not i.is_symlink()
-                ]
-            )
+    @cached_property
+    def signer(self) -> CodeSigner:
+        """codesigner shared with the maxutils package"""
+        return CodeSigner(self.path, self.dev_id, self.entitlements)
 
-        self.log.info("%s : %s found", category, len(resources))
-
-        for resource in progressbar(resources):
-            if not HAVE_PROGRESSBAR:
-                self.log.info("%s: %s", category, resource)
-            if not self.dry_run:
-                res = subprocess.run(
-                    self.cmd_codesign + ["-f", resource],
-                    capture_output=True,
-                    encoding="utf8",
-                    check=True,
-                )
-                if res.returncode != 0:
-                    self.log.critical(res.stderr)
+    def sign_group(self, category, subpath):
+        """used to collect and codesign items in a bundle subpath"""
+        if self.dry_run:
+            self.log.info("%s: %s (dry run)", category, subpath)
+            return
+        self.signer.sign_group(category, subpath)
 
     def sign_runtime(self):
         """codesign bundle runtime."""
         self.log.info("signing runtime: %s", self.path)
         if not self.dry_run:
-            res = subprocess.run(
-                self.cmd_codesign
-                + [
-                    "--options",
-                    "runtime",
-                    "--entitlements",
-                    str(self.entitlements),
-                    str(self.path),
-                ],
-                capture_output=True,
-                encoding="utf8",
-                check=True,
-            )
-            if res.returncode != 0:
-                self.log.critical(res.stderr)
+            self.signer.sign_runtime()
 
     def codesign(self):
-        """codesign standalone app bundle"""
+        """codesign standalone app bundle
+
+        When only cleaning (no shrinking), the two signed subtrees are cleaned
+        concurrently and each is signed as soon as its own clean exits.
+        """
+        groups = {
+            "externals": "Contents/Resources/C74",
+            "frameworks": "Contents/Frameworks",
+        }
+        cleaning = {}
         if self.pre_clean:
             self.log.info("cleaning app bundle")
-            self.clean()
+            if self.arch == "dual":
+                for subpath in groups.values():
+                    if (self.path / subpath).exists():
+                        cleaning[subpath] = subprocess.Popen(
+                            ["xattr", "-cr", str(self.path / subpath)]
+                        )
+                self.clean_outside(groups.values())
+            else:
+                self.clean()
         if self.arch != "dual":
-            initial_size = self.get_size()
             self.log.info("shrinking to %s", self.arch)
-            self.shrink()
-            self.log.info("BEFORE: %s", initial_size)
-            self.log.info("AFTER:  %s", self.get_size())
+            before, after = self.shrink()
+            self.log.info("BEFORE: %s", format_size(before))
+            self.log.info("AFTER:  %s", format_size(after))
         if not self.entitlements:
             self.entitlements = self.generate_entitlements()
         self.entitlements = Path(self.entitlements).absolute()
-        self.sign_group("externals", "Contents/Resources/C74/**/*.{ext}")
-        self.sign_group("frameworks", "Contents/Frameworks/**/*.{ext}")
+        if not self.dry_run:
+            # once, so concurrent codesign workers never prompt
+            self.signer.unlock_keychain()
+        for category, subpath in groups.items():
+            if subpath in cleaning and cleaning[subpath].wait():
+                raise subprocess.CalledProcessError(
+                    cleaning[subpath].returncode, cleaning[subpath].args
+                )
+            self.sign_group(category, subpath)
         self.sign_runtime()
         self.log.info("DONE")
 
     def copy(self):
         """recursively copies codesigned bundle to output directory"""
         self.log.info("copying: %s to %s", self.path, self.app_path)
-        self.cmd(f"ditto '{self.path}' '{self.app_path}'")
+        shutil.copytree(self.path, self.app_path, symlinks=True, dirs_exist_ok=True)
 
     def zip(self):
-        """create a zip archive suitable for notarization."""
-        self.cmd(f"ditto -c -k --keepParent '{self.app_path}' '{self.zip_path}'")
+        """create a zip archive suitable for notarization.
+
+        Uses `ditto` (see `MacShellCmd.zip`), which keeps the extended
+        attributes holding the signatures of codesigned non-Mach-O files.
+        """
+        MacShellCmd(self.log).zip(self.app_path, self.zip_path, compression=6)
 
     def package(self):
-        """package a signed app bundle for notarization."""
+        """package a signed app bundle for notarization.
+
+        The bundle is first copied to output_dir, where `zip` expects it.
+        """
+        self.copy()
         self.zip()
 
     def notarize(self):
-        """notarize using altool for xcode < 13
+        """notarize using notarytool, waiting for the final status
 
         Does the equivalent of:
 
-        xcrun altool --notarize-app -f app.zip -t osx -u "sam.smith@gmail.com" -p xxxx-xxxx-xxxx-xxxx -primary-bundle-id com.atari.pacman
+        xcrun notarytool submit app.zip --apple-id "sam.smith@gmail.com" --password xxxx-xxxx-xxxx-xxxx --team-id ABCDE12345 --wait
+
+        Transient failures (network errors, throttling) are retried with
+        exponential backoff, see `maxutils.notary.submit`. Accepted submissions are cached by the zip's
+        sha256 digest in ~/.cache/maxutils/notarize.json, so identical bytes
+        are not resubmitted.
         """
-        self.cmd(
-            f"xcrun altool --notarize-app -f {self.zip_path} -t osx -u {self.appleid} -p {self.app_password} -primary-bundle-id {self.app_bundle_id}"
+        cache = load_cache("notarize.json")
+        digest = file_digest(self.zip_path)
+        if digest in cache:
+            self.log.info("%s already notarized: %s", self.zip_path, cache[digest])
+            return
+        if not self.appleid:
+            raise ValueError("appleid (or APPLE_ID env var) is required by notarytool")
+        if not self.app_password:
+            raise ValueError(
+                "app_password (or APP_PASSWORD env var) is required by notarytool"
+            )
+        if not self.team_id:
+            raise ValueError("team_id (or TEAM_ID env var) is required by notarytool")
+        result = notary.submit(
+            self.zip_path, self.appleid, self.app_password, self.team_id, self.log
         )
+        if result.get("status") != "Accepted":
+            self.log.critical("notarization failed: %s", result)
+            raise RuntimeError(f"notarization of {self.zip_path} not accepted")
+        cache[digest] = result["id"]
+        save_cache("notarize.json", cache)
 
     def unzip_notarized(self):
         """unzip notarized to output_dir"""
         self.output_dir.mkdir(exist_ok=True)
-        self.cmd(f"unzip -d '{self.output_dir}' '{self.zip_path}'")
+        MacShellCmd(self.log).unzip(self.zip_path, self.output_dir)
 
     def staple(self):
         """staple successful notarization to app.bundle"""
-        self.cmd(f"xcrun stapler staple -v {self.path}")
+        self.cmd(["xcrun", "stapler", "staple", "-v", self.path])
 
     def repackage(self):
-        """repackage, rezip stapled app.bundle with other related files."""
-        self.cmd(
-            f"ditto -c -k --keepParent {self.output_dir} {self.appname}-{self.app_version}-{self.arch}.zip"
-        )
+        """repackage, rezip stapled app.bundle with other related files.
+
+        Entries are stored uncompressed: the bulk of a standalone is Mach-O
+        code and media, which do not compress well. Like the notarization
+        zip, it is made with `ditto` so that no signature is lost.
+        """
+        product = Path(f"{self.appname}-{self.app_version}-{self.arch}.zip")
+        MacShellCmd(self.log).zip(self.output_dir, product, compression=0)
+        with zipfile.ZipFile(product, "a", zipfile.ZIP_STORED) as archive:
+            for extra in CONFIG["include"]:
+                if Path(extra).exists():
+                    archive.write(extra, Path(extra).name)
+        return product
 
     def process(self):
         """complete process"""
@@ -375,17 +433,28 @@ class MaxStandalone:
         if args.command == "generate" and args.path and args.config_json:
             cls(args.path).generate_config()
 
-        elif args.command == "codesign" and args.path and args.dev_id:
+        output_dir = args.output_dir or "output"
+
+        if args.command == "codesign" and args.path and args.dev_id:
             cls(
                 args.path,
                 args.dev_id,
                 args.entitlements,
-                args.output_dir,
-                args.clean,
-                args.arch,
-                args.dry_run,
+                output_dir,
+                pre_clean=args.clean,
+                arch=args.arch,
+                dry_run=args.dry_run,
             ).codesign()
 
+        elif args.command == "package" and args.path:
+            cls(args.path, output_dir=output_dir).package()
+
+        elif args.command == "notarize" and args.path:
+            cls(
+                args.path,
+                output_dir=args.output_dir or Path(args.path).parent,
+            ).notarize()
+
 
 if __name__ == "__main__":
     MaxStandalone.cmdline()
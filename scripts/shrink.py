@@ -12,9 +12,12 @@ import argparse
 import logging
 import os
 import pathlib
+import shutil
 import subprocess
 import sys
 
+from maxutils.shell import dir_size, format_size
+
 DEBUG = True
 
 
@@ -49,27 +52,28 @@ class Shrink:
 
         self.arch = arch_to_keep
 
-    def cmd(self, shellcmd, *args, **kwds):
-        """run system command"""
-        syscmd = shellcmd.format(*args, **kwds)
-        self.log.debug(syscmd)
-        os.system(syscmd)
+    def cmd(self, argv, check=True):
+        """run command from an argument list, without an intermediary shell"""
+        argv = [str(arg) for arg in argv]
+        self.log.debug(" ".join(argv))
+        subprocess.run(argv, check=check)
 
     def cmd_output(self, arglist):
         """capture and return shell _cmd output."""
-        return subprocess.check_output(arglist).decode("utf8")
+        return subprocess.check_output(arglist, encoding="utf8")
 
     def get_size(self):
         """get total size of target path"""
-        return self.cmd_output(["du", "-s", "-h", self.path]).strip()
+        return format_size(dir_size(self.path))
 
     def remove_arch(self):
         """removes arch from fat binary"""
         tmp = self.path.parent / (self.path.name + "__tmp")
         self.log.info("START: %s", self.path)
-        self.cmd(f"ditto --arch '{self.arch}' '{self.path}' '{tmp}'")
-        self.cmd(f"rm -rf '{self.path}'")
-        self.cmd(f"mv '{tmp}' '{self.path}'")
+        self.cmd(["ditto", "--arch", self.arch, self.path, tmp])
+        if self.path.is_dir():
+            shutil.rmtree(self.path)
+        os.replace(tmp, self.path)
 
     def process(self):
         """main process to recursive remove unneeded arch."""
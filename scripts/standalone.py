@@ -7,16 +7,23 @@ A cli tool to manage post-production tasks for max standalones.
 # pylint: disable = R0913, R0902, C0103
 
 import argparse
+import asyncio
 import datetime
+import itertools
 import json
 import logging
 import os
 import plistlib
+import shutil
 import subprocess
 import sys
+from functools import cached_property
 from pathlib import Path
 from typing import Union, Optional
 
+from maxutils import notary
+from maxutils.shell import dir_size, format_size, write_if_changed
+
 try:
     import tqdm
 
@@ -24,7 +31,7 @@ try:
     progressbar = tqdm.tqdm # type: ignore
 except ImportError:
     HAVE_PROGRESSBAR = False
-    def progressbar(x):
+    def progressbar(x, **kwds):
         "no-op -- does nothing"
         return x
 
@@ -40,6 +47,8 @@ PathLike = Union[str, Path]
 
 DEBUG = True
 
+SIGNABLE_EXTENSIONS = (".mxo", ".framework", ".dylib", ".bundle")
+
 CONFIG = {
     "standalone": "Groovin.app",
     "arch": "dual",
@@ -61,6 +70,11 @@ CONFIG = {
     },
 }
 
+# pre-serialized forms of the static defaults above (XML: codesign does not
+# accept binary entitlements plists)
+ENTITLEMENTS_PLIST: bytes = plistlib.dumps(CONFIG["entitlements"])
+CONFIG_JSON: bytes = json.dumps(CONFIG, indent=2).encode("utf8")
+
 # ----------------------------------------------------------------------------
 # LOGGING CONFIGURATION
 
@@ -96,10 +110,6 @@ handler = logging.StreamHandler()
 handler.setFormatter(CustomFormatter())
 logging.basicConfig(level=logging.DEBUG if DEBUG else logging.INFO, handlers=[handler])
 
-# ----------------------------------------------------------------------------
-# UTILITY FUNCTIONS
-
-
 # ----------------------------------------------------------------------------
 # CLASSES
 
@@ -113,11 +123,11 @@ class Base:
     def __repr__(self):
         return f"<{self.__class__.__name__}>"
 
-    def cmd(self, shellcmd: str, *args, **kwds):
-        """run system command."""
-        syscmd = shellcmd.format(*args, **kwds)
-        self.log.debug(syscmd)
-        os.system(syscmd)
+    def cmd(self, arglist: list, check: bool = True) -> subprocess.CompletedProcess:
+        """run command from an argument list, without an intermediary shell."""
+        args = [str(arg) for arg in arglist]
+        self.log.debug(" ".join(args))
+        return subprocess.run(args, check=check)
 
     def cmd_output(self, arglist: list[str]) -> str:
         """capture and return shell cmd output."""
@@ -127,13 +137,23 @@ class Base:
     def notify(self, title: str, txt: str):
         """notify via macos, notifcation with title and text."""
         self.cmd(
-            f"""osascript -e 'display notification "{txt}" with title "{title}"'"""
+            [
+                "osascript",
+                "-e",
+                "on run argv",
+                "-e",
+                "display notification (item 2 of argv) with title (item 1 of argv)",
+                "-e",
+                "end run",
+                title,
+                txt,
+            ]
         )
 
     def copy(self, src_path: str, dst_path: str):
-        """recursively copy from src path to dst path."""
+        """recursively copy from src path to dst path (symlinks preserved)."""
         self.log.info("copying: %s to %s", src_path, dst_path)
-        self.cmd(f"ditto '{src_path}' '{dst_path}'")
+        shutil.copytree(src_path, dst_path, symlinks=True, dirs_exist_ok=True)
 
     def zip(self, src: Path, dst: Path):
         """create a zip archive of src path at dst path.
@@ -141,7 +161,7 @@ class Base:
         Expects a folder 'src' parameter.
         """
         self.log.info("zipping %s as %s", src, dst)
-        self.cmd(f"ditto -c -k --keepParent '{src}' '{dst}'")
+        self.cmd(["ditto", "-c", "-k", "--keepParent", src, dst])
 
 
 class Generator(Base):
@@ -156,7 +176,7 @@ class Generator(Base):
         self.path = Path(path)
         super().__init__()
 
-    @property
+    @cached_property
     def appname(self):
         """derives lower-case app name from standalone name <appname>.app"""
         return self.path.stem.lower()
@@ -165,16 +185,15 @@ class Generator(Base):
         """generates a default enttitelements.plist file"""
         if not path:
             path = f"{self.appname}-entitlements.plist"
-        with open(path, "wb") as fopen:
-            plistlib.dump(CONFIG["entitlements"], fopen)
+        # unchanged files are not rewritten, keeping their mtime stable
+        write_if_changed(path, ENTITLEMENTS_PLIST)
         return path
 
     def generate_config(self, path=None) -> str:
         """generates a default entitlements.plist file"""
         if not path:
             path = f"{self.appname}.json"
-        with open(path, "w", encoding="utf8") as fopen:
-            json.dump(CONFIG, fopen, indent=2)
+        write_if_changed(path, CONFIG_JSON)
         return path
 
 
@@ -205,27 +224,25 @@ class PreProcessor(Base):
 
     def get_size(self, path=None) -> str:
         """get total size of target path"""
-        if not path:
-            path = self.path
-        return self.cmd_output(["du", "-s", "-h", str(path)]).strip()
+        return format_size(dir_size(path or self.path))
 
     def remove_attributes(self):
         """recursively remove extended attributes from bundle"""
-        self.cmd(f"xattr -cr {self.path}")
+        self.cmd(["xattr", "-cr", self.path])
 
     def shrink(self):
         """recursively thins fat binaries in a given folder"""
         self.log.info("shrinking: %s", self.path)
         tmp = self.path.parent / f"{self.path.name}__tmp"
         self.log.info("START: %s", self.path)
-        self.cmd(f"ditto --arch '{self.arch}' '{self.path}' '{tmp}'")
-        self.cmd(f"rm -rf '{self.path}'")
-        self.cmd(f"mv '{tmp}' '{self.path}'")
+        self.cmd(["ditto", "--arch", self.arch, self.path, tmp])
+        shutil.rmtree(self.path)
+        os.replace(tmp, self.path)
 
     def normalize_permissions(self):
         """recursively normalize permissions (u+rw) in app bundle."""
         self.log.info("change permissions of %s via 'sudo chmod -R u+rw'", self.path)
-        self.cmd(f"chmod -R u+rw {self.path}")
+        self.cmd(["chmod", "-R", "u+rw", self.path])
 
     def process(self) -> Path:
         """main class process"""
@@ -252,41 +269,53 @@ class CodeSigner(Base):
         -> a-signed.zip
     """
 
+    batch_size = 32  # max paths per codesign invocation
+
     def __init__(
         self,
         path: PathLike,
         dev_id: str,
         entitlements: Optional[str] = None,
         packaging="zip",
+        force: bool = False,
     ):
         self.path = Path(path)
         self.dev_id = dev_id
         self.entitlements = entitlements
         self.packaging = packaging
+        self.force = force
         self.authority = f"Developer ID Application: {self.dev_id}"
-        self._cmd_codesign = ["codesign", "-s", self.authority, "--timestamp", "--deep"]
+        self._cmd_codesign = ("codesign", "-s", self.authority, "--timestamp")
+        self._cmd_resign = (*self._cmd_codesign, "-f")
+        self._cmd_verify = (
+            "codesign",
+            "--verify",
+            "--strict",
+            "-R=anchor apple generic and "
+            f'certificate leaf[subject.CN] = "{self.authority}*"',
+        )
         super().__init__()
 
     def _suffix_path(self, suffix):
         """helper utility to get suffix differentiated path."""
         return self.path.parent / f"{self.path.stem}.{suffix}"
 
-    @property
+    @cached_property
     def appname(self):
         """derives lower-case app name from standalone name <appname>.app"""
         return self.path.stem.lower()
 
-    @property
+    @cached_property
     def zip_path(self):
         """zip path"""
         return self._suffix_path("zip")
 
-    @property
+    @cached_property
     def pkg_path(self):
         """pkg path"""
         return self._suffix_path("pkg")
 
-    @property
+    @cached_property
     def dmg_path(self):
         """dmg path"""
         return self._suffix_path("dmg")
@@ -309,48 +338,135 @@ class CodeSigner(Base):
 
     def sign_group(self, category: str, subpath: str):
         """used to collect and codesign items in a bundle subpath"""
-        resources = []
-        for ext in ["mxo", "framework", "dylib", "bundle"]:
-            resources.extend(
-                [
-                    i
-                    for i in self.path.glob(subpath.format(ext=ext))
-                    if not i.is_symlink()
-                ]
-            )
+        resources = self.collect_resources(subpath)
 
         self.log.info("%s : %s found", category, len(resources))
 
-        for resource in progressbar(resources):
-            if not HAVE_PROGRESSBAR:
-                self.log.info("%s: %s", category, resource)
-            res = subprocess.run(
-                self._cmd_codesign + ["-f", resource],
-                capture_output=True,
-                encoding="utf8",
-                check=True,
+        # without --deep, nested resources must be signed before their parents,
+        # so sign in waves of equal depth, deepest first, concurrently within a wave
+        resources.sort(key=lambda p: (-len(p.parts), p.as_posix()))
+        asyncio.run(self._sign_waves(category, resources))
+
+    async def _sign_waves(self, category: str, resources: list[Path]):
+        """codesign resources wave by wave with at most cpu_count processes"""
+        workers = os.cpu_count() or 1
+        sem = asyncio.Semaphore(workers)
+        pbar = None
+        if HAVE_PROGRESSBAR:
+            pbar = progressbar(total=len(resources), desc=category)
+        for _, group in itertools.groupby(resources, key=lambda p: len(p.parts)):
+            wave = list(group)
+            # codesign signs many paths per invocation: batch to amortize
+            # process startup, while still spreading the wave over all workers
+            size = max(1, min(self.batch_size, -(-len(wave) // workers)))
+            tasks = [
+                asyncio.ensure_future(self.sign_resources(sem, wave[i : i + size]))
+                for i in range(0, len(wave), size)
+            ]
+            for task in asyncio.as_completed(tasks):
+                batch = await task
+                if pbar:
+                    pbar.update(len(batch))
+                else:
+                    for resource in batch:
+                        self.log.info("%s: %s", category, resource)
+        if pbar:
+            pbar.close()
+
+    def collect_resources(self, subpath: str) -> list[Path]:
+        """collect signable resources under subpath in a single walk
+
+        Symlinks are skipped using the type information os.scandir already
+        holds for each entry, rather than an lstat per candidate path.
+        """
+        resources = []
+        stack = [str(self.path / subpath)]
+        while stack:
+            try:
+                entries = os.scandir(stack.pop())
+            except FileNotFoundError:
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.is_symlink():
+                        continue
+                    if entry.name.endswith(SIGNABLE_EXTENSIONS):
+                        resources.append(Path(entry.path))
+                    if entry.is_dir():
+                        stack.append(entry.path)
+        return resources
+
+    async def is_signed(self, resource: Path) -> bool:
+        """check if resource is validly signed by the signing authority"""
+        probe = await asyncio.create_subprocess_exec(
+            *self._cmd_verify,
+            str(resource),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        return await probe.wait() == 0
+
+    async def sign_resources(
+        self, sem: asyncio.Semaphore, resources: list[Path]
+    ) -> list[Path]:
+        """codesign a batch of resources in a single codesign invocation
+
+        Unless `force` is set, resources already validly signed by the
+        signing authority are skipped: the verification probe is much
+        cheaper than re-hashing and re-signing.
+        """
+        async with sem:
+            unsigned = [
+                resource
+                for resource in resources
+                if self.force or not await self.is_signed(resource)
+            ]
+            if not unsigned:
+                return resources
+            argv = (*self._cmd_resign, *map(str, unsigned))
+            proc = await asyncio.create_subprocess_exec(
+                *argv, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
             )
-            if res.returncode != 0:
-                self.log.critical(res.stderr)
+            _, stderr = await proc.communicate()
+        if proc.returncode:
+            self.log.critical(stderr.decode())
+            raise subprocess.CalledProcessError(proc.returncode, argv, stderr=stderr)
+        return resources
+
+    def unlock_keychain(self):
+        """unlock the signing keychain once, before signing starts.
+
+        Uses $KEYCHAIN_PASSWORD and $KEYCHAIN (default: login.keychain-db).
+        """
+        password = os.getenv("KEYCHAIN_PASSWORD")
+        if not password:
+            return
+        keychain = os.getenv("KEYCHAIN", "login.keychain-db")
+        self.log.info("unlocking keychain: %s", keychain)
+        subprocess.run(
+            ["security", "unlock-keychain", "-p", password, keychain], check=True
+        )
 
     def sign_runtime(self):
         """codesign bundle runtime."""
         self.log.info("signing runtime: %s", self.path)
-        res = subprocess.run(
-            self._cmd_codesign
-            + [
-                "--options",
-                "runtime",
-                "--entitlements",
-                str(self.entitlements),
-                str(self.path),
-            ],
-            capture_output=True,
-            encoding="utf8",
-            check=True,
-        )
-        if res.returncode != 0:
-            self.log.critical(res.stderr)
+        try:
+            subprocess.run(
+                [
+                    *self._cmd_codesign,
+                    "--options",
+                    "runtime",
+                    "--entitlements",
+                    str(self.entitlements),
+                    str(self.path),
+                ],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                check=True,
+            )
+        except subprocess.CalledProcessError as e:
+            self.log.critical(e.stderr.decode("utf8", "replace"))
+            raise
 
     def dmg(self, src: Path, dst: Path, dev_id: str, volname: Optional[str] = None):
         """create a dmg archive.
@@ -362,14 +478,32 @@ class CodeSigner(Base):
         assert src.suffix in [".app", ".pkg"], "Expects an '.app' or '.pkg' src param."
         self.log.info("creating %s", dst)
         self.cmd(
-            f"hdiutil create -volname '{volname}' -srcfolder '{src}' "
-            f"-ov -format UDZO '{dst}'"
+            [
+                "hdiutil",
+                "create",
+                "-volname",
+                volname,
+                "-srcfolder",
+                src,
+                "-ov",
+                "-format",
+                "UDZO",
+                dst,
+            ]
         )
         self.log.info("codesigning %s", dst)
         self.cmd(
-            f"codesign --deep --force --verify --verbose "
-            f"--sign 'Developer ID Application: {dev_id}' "
-            f"--options runtime '{dst}'"
+            [
+                "codesign",
+                "--force",
+                "--verify",
+                "--verbose",
+                "--sign",
+                f"Developer ID Application: {dev_id}",
+                "--options",
+                "runtime",
+                dst,
+            ]
         )
 
     def pkg(self, src: Path, dst: Path, dev_id: str):
@@ -379,8 +513,15 @@ class CodeSigner(Base):
         """
         assert src.suffix == ".app", "Expects an appbundle as a 'src' param."
         self.cmd(
-            f"productbuild --sign 'Developer ID Installer: {dev_id}' "
-            f"--component {src} /Applications {dst}"
+            [
+                "productbuild",
+                "--sign",
+                f"Developer ID Installer: {dev_id}",
+                "--component",
+                src,
+                "/Applications",
+                dst,
+            ]
         )
 
     def process(self) -> Path:
@@ -389,8 +530,9 @@ class CodeSigner(Base):
             gen = Generator(self.appname)
             self.entitlements = gen.generate_entitlements()
         self.entitlements = Path(self.entitlements).absolute()
-        self.sign_group("externals", "Contents/Resources/C74/**/*.{ext}")
-        self.sign_group("frameworks", "Contents/Frameworks/**/*.{ext}")
+        self.unlock_keychain()
+        self.sign_group("externals", "Contents/Resources/C74")
+        self.sign_group("frameworks", "Contents/Frameworks")
         self.sign_runtime()
         self.log.info("app codesigning DONE")
         if self.packaging == "pkg":
@@ -418,6 +560,8 @@ class Notarizer(Base):
         -> output_dir/a-notarized.app
     """
 
+    retries = 5  # submission attempts before giving up
+
     def __init__(
         self,
         path: PathLike,
@@ -425,12 +569,14 @@ class Notarizer(Base):
         app_password: str,
         app_bundle_id: str,
         output_dir: str = "output",
+        team_id: Optional[str] = None,
     ):
         self.path = Path(path)
-        self.apple_id = apple_id
-        self.app_password = app_password
-        self.app_bundle_id = app_bundle_id
+        self.apple_id = apple_id or os.getenv("APPLE_ID")
+        self.app_password = app_password or os.getenv("APP_PASSWORD")
+        self.app_bundle_id = app_bundle_id or os.getenv("APP_BUNDLE_ID")
         self.output_dir = Path(output_dir)
+        self.team_id = team_id or os.getenv("TEAM_ID")
         super().__init__()
 
     def is_notarized(self) -> bool:
@@ -441,32 +587,37 @@ class Notarizer(Base):
         )
         return ("accepted" in res) and ("source=Notarized Developer ID" in res)
 
-    def notarize(self):
-        """notarize using altool (for xcode < 13)."""
-        self.log.info("notarizing %s", self.path)
+    def submit(self) -> dict:
+        """submit to the notary service, waiting for a final status.
 
-        res = self.cmd_output(
-            [
-                "xcrun",
-                "altool",
-                "--notarize-app",
-                "--file",
-                str(self.path),
-                "-t",
-                "osx",
-                "-u",
-                self.apple_id,
-                "-p",
-                self.app_password,
-                "-primary-bundle-id",
-                self.app_bundle_id,
-            ]
+        Transient failures (network errors, throttling) are retried with
+        exponential backoff, see `maxutils.notary.submit`.
+        """
+        if not self.apple_id:
+            raise ValueError("apple_id (or APPLE_ID env var) is required by notarytool")
+        if not self.app_password:
+            raise ValueError(
+                "app_password (or APP_PASSWORD env var) is required by notarytool"
+            )
+        if not self.team_id:
+            raise ValueError("team_id (or TEAM_ID env var) is required by notarytool")
+        return notary.submit(
+            self.path,
+            self.apple_id,
+            self.app_password,
+            self.team_id,
+            self.log,
+            retries=self.retries,
         )
-        if "No errors uploading" not in res:
-            self.log.critical(res)
-            sys.exit()
-        else:
-            self.log.info(res)
+
+    def notarize(self):
+        """notarize using notarytool (xcode >= 13)."""
+        self.log.info("notarizing %s", self.path)
+        result = self.submit()
+        if result.get("status") != "Accepted":
+            self.log.critical(result)
+            sys.exit(1)
+        self.log.info("submission %s accepted", result.get("id"))
 
     def process(self) -> PathLike:
         """notarize zipped standalone.app"""
@@ -481,7 +632,7 @@ class Notarizer(Base):
         # else .zip
         self.log.info("app notarized")
         self.log.info("removing zip used for notarization")
-        self.cmd("rm {self.path}")
+        self.path.unlink()
         self.log.info(".app will be processed for stapling")
         signed_app = self.path.parent / f"{self.path.stem}.app"
         assert signed_app.exists(), "signed app not available"
@@ -502,7 +653,7 @@ class Stapler(Base):
     def staple(self):
         """staple successful notarization to app.bundle"""
         self.log.info("stapling %s", self.path)
-        self.cmd(f"xcrun stapler staple -v {self.path}")
+        self.cmd(["xcrun", "stapler", "staple", "-v", self.path])
 
     def process(self) -> PathLike:
         """stapling process"""
@@ -517,7 +668,7 @@ class Distributor(Base):
         -> a-packaged.zip
     """
 
-    FORMATS = set(["app", "pkg", "dmg"])
+    FORMATS = {".app", ".pkg", ".dmg"}
 
     def __init__(self, path: PathLike, dev_id: str, version: str, arch: str):
         self.path = Path(path)
@@ -528,31 +679,30 @@ class Distributor(Base):
         super().__init__()
         assert self.path.suffix in self.FORMATS, f"must one of {self.FORMATS}"
 
-    @property
+    @cached_property
     def appname(self):
         """derives lower-case app name from standalone name <appname>.app"""
         return self.path.stem.lower()
 
-    @property
+    @cached_property
     def release_name(self):
         """name with version, datestamp and architecture"""
         return f"{self.appname}-{self.version}-{self.arch}"
 
-    @property
+    @cached_property
     def product(self):
         """final preprocessed codesigned notarized stapled packaged product!"""
-        return Path(f"{self.release_name}.{self.path.suffix}")
+        if self.path.suffix == ".dmg":
+            return self.path.parent / f"{self.release_name}.dmg"
+        return Path(f"{self.release_name}.zip")
 
     def package(self):
         """package .app or folder containing .app w/ related files.
         """
-        suffix = self.path.suffix
-        if suffix == ".app":
-            self.zip(self.path, self.product)
-        if suffix == ".pkg":
+        if self.path.suffix == ".dmg":
+            self.path.rename(self.product)
+        else:
             self.zip(self.path, self.product)
-        if suffix == ".dmg":
-            self.path.rename(self.path.parent / f"{self.release_name}.{suffix}")
 
     def process(self):
         """final codesigned, notarized standalone packaging process."""
@@ -699,7 +849,46 @@ class MetaCommander(type):
                     subcmd["options"] = func.options
                 subcmds[name] = subcmd
         classdict["_argparse_subcmds"] = subcmds
-        return type.__new__(mcs, classname, bases, classdict)
+        klass = type.__new__(mcs, classname, bases, classdict)
+        klass._parser = mcs._build_parser(klass)
+        return klass
+
+    @staticmethod
+    def _build_parser(klass) -> argparse.ArgumentParser:
+        """build the commandline parser once, at class-creation time."""
+        parser = argparse.ArgumentParser(
+            # prog = klass.name,
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+            description=klass.__doc__,
+            epilog=getattr(klass, "epilog", ""),
+        )
+
+        parser.add_argument(
+            '-v', '--version', action='version',
+            version=f'%(prog)s {getattr(klass, "version", "")}'
+        )
+
+        ## default arg
+        # parser.add_argument('--verbose', '-v', help='increase verbosity')
+
+        # non-subcommands here
+
+        subparsers = parser.add_subparsers(
+            title='subcommands',
+            description='valid subcommands',
+            help='additional help',
+            metavar="",
+        )
+
+        for name in sorted(klass._argparse_subcmds.keys()):
+            subcmd = klass._argparse_subcmds[name]
+            subparser = subparsers.add_parser(subcmd['name'],
+                                              help=subcmd['func'].__doc__)
+            for args, kwds in subcmd['options']:
+                subparser.add_argument(*args, **kwds)
+            subparser.set_defaults(func=subcmd['func'])
+
+        return parser
 
 
 # ------------------------------------------------------------------------------
@@ -745,6 +934,8 @@ class Application(metaclass=MetaCommander):
         pre.process()
 
 
+    @option("--force", "-f", action="store_true",
+            help="re-sign resources which are already validly signed")
     @option("--dry-run", action="store_true",
             help="run process without actually doing anything")
     @option("--arch", "-a", default="dual",
@@ -756,15 +947,25 @@ class Application(metaclass=MetaCommander):
     @arg("path", type=str, help="path to standalone")
     def do_codesign(self, args):
         """codesign max standalone."""
-        sig = CodeSigner(args.path, args.dev_id, args.entitlements)
+        sig = CodeSigner(args.path, args.dev_id, args.entitlements, force=args.force)
         sig.process()
 
 
+    @option("--output-dir", "-o", type=str, default="output",
+            help="output directory")
+    @option("--team-id", "-t", type=str,
+            help="Apple Developer Team ID (default: $TEAM_ID)")
+    @option("--app-bundle-id", "-b", type=str,
+            help="app bundle id")
+    @option("--app-password", "-p", type=str,
+            help="app-specific password")
+    @option("--apple-id", "-i", type=str,
+            help="Apple ID")
     @arg("path", type=str, help="path to package")
     def do_notarize(self, args):
         """notarize codesigned max standalone."""
         notary = Notarizer(args.path, args.apple_id, args.app_password,
-                           args.app_bundle_id, args.output_dir)
+                           args.app_bundle_id, args.output_dir, args.team_id)
         notary.process()
 
 
@@ -800,41 +1001,7 @@ class Application(metaclass=MetaCommander):
 
     def cmdline(self):
         """commandline interface generator."""
-        parser = argparse.ArgumentParser(
-            # prog = self.name,
-            formatter_class=argparse.ArgumentDefaultsHelpFormatter,
-            description=self.__doc__,
-            epilog=self.epilog,
-        )
-
-        parser.add_argument(
-            '-v', '--version', action='version', version=f'%(prog)s {self.version}'
-        )
-
-        ## default arg
-        # parser.add_argument('--verbose', '-v', help='increase verbosity')
-
-        # non-subcommands here
-
-        subparsers = parser.add_subparsers(
-            title='subcommands',
-            description='valid subcommands',
-            help='additional help',
-            metavar="",
-        )
-
-        for name in sorted(self._argparse_subcmds.keys()):
-            subcmd = self._argparse_subcmds[name]
-            subparser = subparsers.add_parser(subcmd['name'],
-                                              help=subcmd['func'].__doc__)
-            for args, kwds in subcmd['options']:
-                subparser.add_argument(*args, **kwds)
-            subparser.set_defaults(func=subcmd['func'])
-
-        if len(sys.argv) <= 1:
-            options = parser.parse_args(self.default_args)
-        else:
-            options = parser.parse_args()
+        options = self._parser.parse_args(sys.argv[1:] or self.default_args)
         options.func(self, options)
 
 
@@ -0,0 +1,10 @@
+import pytest
+
+from maxutils import shell
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    # keep signing/notarization caches out of the real ~/.cache
+    monkeypatch.setattr(shell, 'CACHE_DIR', tmp_path / 'cache')
+    return tmp_path / 'cache'
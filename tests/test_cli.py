@@ -0,0 +1,33 @@
+import sys
+
+from maxutils.cli import Commander, option, arg
+
+
+class App(Commander):
+    """app: test app"""
+
+    name = "app"
+
+    def __init__(self):
+        self.result = None
+
+    @option("--flag", "-f", action="store_true", help="a flag")
+    @arg("path", type=str, help="a path")
+    def do_run(self, args):
+        "run something"
+        self.result = (args.path, args.flag)
+
+
+def test_cli_parser_built_once():
+    assert App._argparse_parser is App._argparse_parser
+    assert "run" in App._argparse_subcmds
+
+
+def test_cli_cmdline(monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["app", "run", "x", "-f"])
+    app = App()
+    app.cmdline()
+    assert app.result == ("x", True)
+    monkeypatch.setattr(sys, "argv", ["app", "run", "y"])
+    app.cmdline()
+    assert app.result == ("y", False)
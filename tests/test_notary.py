@@ -0,0 +1,27 @@
+import subprocess
+
+from maxutils import notary
+
+
+def test_notary_is_transient():
+    assert notary.is_transient('Error: HTTP status code: 503. Service Unavailable')
+    assert notary.is_transient('The request timed out.')
+    assert not notary.is_transient('Error: HTTP status code: 401. Unable to authenticate.')
+    assert not notary.is_transient('Error: File not found: a.zip')
+
+def test_notary_submit_retries_transient_only(monkeypatch):
+    outputs = []
+    def run(args, **kwds):
+        stdout, stderr = outputs.pop(0)
+        return subprocess.CompletedProcess(args, 1, stdout=stdout, stderr=stderr)
+    monkeypatch.setattr(notary.subprocess, 'run', run)
+    sleeps = []
+    monkeypatch.setattr(notary.time, 'sleep', sleeps.append)
+    outputs[:] = [('', 'The request timed out.'),
+                  ('{"id": "abc", "status": "Accepted"}', '')]
+    assert notary.submit('a.zip', 'id', 'pwd', 'team')['status'] == 'Accepted'
+    assert len(sleeps) == 1
+    outputs[:] = [('', 'Error: HTTP status code: 401. Unable to authenticate.')]
+    result = notary.submit('a.zip', 'id', 'pwd', 'team')
+    assert 'authenticate' in result['message']
+    assert len(sleeps) == 1 and not outputs
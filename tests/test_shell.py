@@ -1,8 +1,87 @@
+import os
+import zipfile
+
 import pytest
 
+from maxutils import shell
 from maxutils.fixer import ShellCmd
 
 
 def test_shell_init():
 	s = ShellCmd()
-	assert s.log
\ No newline at end of file
+	assert s.log
+
+def test_shell_run():
+	s = ShellCmd()
+	res = s.run(["true"])
+	assert res.returncode == 0
+
+def test_shell_zip(tmp_path):
+	src = tmp_path / 'a.app'
+	(src / 'bin').mkdir(parents=True)
+	(src / 'bin' / 'x').write_bytes(b'abc')
+	os.chmod(src / 'bin' / 'x', 0o755)
+	(src / 'current').symlink_to('bin')
+	dst = tmp_path / 'a.zip'
+	shell.ShellCmd().zip(src, dst, compression=1)
+	with zipfile.ZipFile(dst) as archive:
+		assert archive.read('a.app/bin/x') == b'abc'
+		assert archive.getinfo('a.app/bin/x').external_attr >> 16 & 0o777 == 0o755
+		assert archive.read('a.app/current') == b'bin'
+		assert 'a.app/current/x' not in archive.namelist()
+
+def test_shell_zip_stored(tmp_path):
+	src = tmp_path / 'out'
+	src.mkdir()
+	(src / 'x').write_bytes(b'abc' * 100)
+	dst = tmp_path / 'a.zip'
+	shell.ShellCmd().zip(src, dst, compression=0)
+	with zipfile.ZipFile(dst) as archive:
+		assert archive.getinfo('out/x').compress_type == zipfile.ZIP_STORED
+	(src / 'y.png').write_bytes(b'abc' * 100)
+	shell.ShellCmd().zip(src, dst, compression=6)
+	with zipfile.ZipFile(dst) as archive:
+		assert archive.getinfo('out/x').compress_type == zipfile.ZIP_DEFLATED
+		assert archive.getinfo('out/y.png').compress_type == zipfile.ZIP_STORED
+
+def test_shell_unzip(tmp_path):
+	src = tmp_path / 'a.app'
+	(src / 'bin').mkdir(parents=True)
+	(src / 'bin' / 'x').write_bytes(b'abc')
+	os.chmod(src / 'bin' / 'x', 0o755)
+	(src / 'current').symlink_to('bin')
+	dst = tmp_path / 'a.zip'
+	shell.ShellCmd().zip(src, dst)
+	out = tmp_path / 'out'
+	shell.ShellCmd().unzip(dst, out)
+	assert (out / 'a.app' / 'bin' / 'x').read_bytes() == b'abc'
+	assert os.stat(out / 'a.app' / 'bin' / 'x').st_mode & 0o777 == 0o755
+	assert os.readlink(out / 'a.app' / 'current') == 'bin'
+
+def test_shell_unzip_existing(tmp_path):
+	src = tmp_path / 'x.framework'
+	(src / 'Versions' / 'A').mkdir(parents=True)
+	(src / 'Versions' / 'A' / 'x').write_bytes(b'abc')
+	(src / 'Versions' / 'Current').symlink_to('A')
+	dst = tmp_path / 'x.zip'
+	shell.ShellCmd().zip(src, dst)
+	out = tmp_path / 'out'
+	shell.ShellCmd().unzip(dst, out)
+	(out / 'x.framework' / 'Versions' / 'A' / 'x').write_bytes(b'old')
+	shell.ShellCmd().unzip(dst, out)
+	assert (out / 'x.framework' / 'Versions' / 'A' / 'x').read_bytes() == b'abc'
+	assert os.readlink(out / 'x.framework' / 'Versions' / 'Current') == 'A'
+
+def test_shell_unzip_unsafe(tmp_path):
+	outside = tmp_path / 'outside'
+	outside.mkdir()
+	for target in (str(outside), '../../outside'):
+		dst = tmp_path / 'a.zip'
+		with zipfile.ZipFile(dst, 'w') as archive:
+			link = zipfile.ZipInfo('a/link')
+			link.external_attr = (0o120777) << 16
+			archive.writestr(link, target)
+			archive.writestr('a/link/pwn', b'pwn')
+		with pytest.raises(ValueError):
+			shell.ShellCmd().unzip(dst, tmp_path / 'out')
+		assert not (outside / 'pwn').exists()
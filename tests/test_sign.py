@@ -54,3 +54,22 @@ def test_sign_not_is_adhoc_signed(external):
 
 
 
+def test_sign_skips_unchanged(tmp_path, monkeypatch):
+    bundle = tmp_path / "ext.mxo"
+    binary = bundle / "Contents" / "lib.dylib"
+    binary.parent.mkdir(parents=True)
+    binary.write_bytes(b"\0" * 16)
+    s = CodesignExternal(bundle)
+    s.collect()
+    assert not s.is_unchanged(binary)
+    s.signed(binary)
+    assert bundle in s._dirty
+    assert not s.is_unchanged(bundle)
+    s.signed(bundle)
+    resigner = CodesignExternal(bundle)
+    resigner.cache = s.cache
+    assert resigner.is_unchanged(binary)
+    assert resigner.is_unchanged(bundle)
+    binary.write_bytes(b"\1" * 32)
+    assert not resigner.is_unchanged(binary)
+    assert not resigner.is_unchanged(bundle)
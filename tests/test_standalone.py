@@ -54,6 +54,316 @@ def test_generator_generate_config_json(standalone):
 def test_existance(standalone):
     assert standalone.exists()
 
+def test_dir_size(tmp_path):
+    (tmp_path / 'sub').mkdir()
+    (tmp_path / 'a').write_bytes(b'x' * 10)
+    (tmp_path / 'sub' / 'b').write_bytes(b'x' * 5)
+    (tmp_path / 'link').symlink_to(tmp_path / 'sub')
+    assert standalone_module.dir_size(tmp_path) == 15 + len(str(tmp_path / 'sub'))
+    assert standalone_module.dir_size(tmp_path / 'a') == 10
+
+def test_preprocessor_scan(tmp_path):
+    app = tmp_path / 'a.app'
+    (app / 'Contents' / 'MacOS').mkdir(parents=True)
+    fat = app / 'Contents' / 'MacOS' / 'a'
+    fat.write_bytes(b'\xca\xfe\xba\xbe\x00\x00\x00\x02'.ljust(8192, b'\x00'))
+    java = app / 'Contents' / 'a.class'
+    java.write_bytes(b'\xca\xfe\xba\xbe\x00\x00\x00\x34'.ljust(8192, b'\x00'))
+    assert standalone_module.is_fat_binary(fat)
+    assert not standalone_module.is_fat_binary(java)
+    p = standalone_module.PreProcessor(app, arch='arm64')
+    size, fat_binaries = p.scan()
+    assert size == 16384
+    assert fat_binaries == [fat]
+
+def test_write_if_changed(tmp_path):
+    p = tmp_path / 'x.plist'
+    standalone_module.write_if_changed(p, b'abc')
+    mtime = p.stat().st_mtime_ns
+    standalone_module.write_if_changed(p, b'abc')
+    assert p.stat().st_mtime_ns == mtime
+    standalone_module.write_if_changed(p, b'abcd')
+    assert p.read_bytes() == b'abcd'
+
+def test_entitlements_plist():
+    import plistlib
+    expected = plistlib.dumps(standalone_module.CONFIG['entitlements'])
+    assert standalone_module.ENTITLEMENTS_PLIST == expected
+
+def test_cache(tmp_path, monkeypatch):
+    assert standalone_module.load_cache('test.json') == {}
+    f = tmp_path / 'a.zip'
+    f.write_bytes(b'abc')
+    digest = standalone_module.file_digest(f)
+    standalone_module.save_cache('test.json', {digest: 'id'})
+    assert standalone_module.load_cache('test.json') == {digest: 'id'}
+
+def test_codesigner_collect(tmp_path):
+    app = tmp_path / 'a.app'
+    c74 = app / 'Contents' / 'Resources' / 'C74'
+    (c74 / 'externals' / 'x.mxo').mkdir(parents=True)
+    (c74 / 'lib').mkdir()
+    (c74 / 'lib' / 'y.dylib').write_bytes(b'')
+    (c74 / 'lib' / 'z.dylib').symlink_to(c74 / 'lib' / 'y.dylib')
+    (c74 / 'lib' / 'readme.txt').write_bytes(b'')
+    s = standalone_module.CodeSigner(app)
+    resources = s.collect('Contents/Resources/C74')
+    assert resources['.mxo'] == [c74 / 'externals' / 'x.mxo']
+    assert resources['.dylib'] == [c74 / 'lib' / 'y.dylib']
+    assert resources['.framework'] == resources['.bundle'] == []
+    assert s.collect('Contents/Resources/C74') is resources
+
+def test_codesigner_cost(tmp_path):
+    app = tmp_path / 'a.app'
+    fw = app / 'Contents' / 'Frameworks'
+    inner = fw / 'x.framework' / 'Versions' / 'A' / 'Frameworks' / 'y.framework'
+    inner.mkdir(parents=True)
+    (inner / 'y').write_bytes(b'x' * 10)
+    (fw / 'x.framework' / 'lib.dylib').write_bytes(b'x' * 5)
+    (fw / 'x.framework' / 'Info.plist').write_bytes(b'x')
+    s = standalone_module.CodeSigner(app)
+    s.collect('Contents/Frameworks')
+    assert s.cost(inner) == 10
+    assert s.cost(fw / 'x.framework' / 'lib.dylib') == 5
+    assert s.cost(fw / 'x.framework') == 16
+
+def test_codesigner_batches():
+    s = standalone_module.CodeSigner('a.app')
+    s.max_workers = 4
+    paths = [pathlib.Path(f'{i}.dylib') for i in range(10)]
+    assert [len(b) for b in s.batches(paths)] == [3, 3, 2, 2]
+    assert next(s.batches(paths))[0] == paths[0]
+    s.batch_size = 2
+    assert [len(b) for b in s.batches(paths)] == [2] * 5
+    s.batch_arg_bytes = 8
+    assert [len(b) for b in s.batches(paths)] == [1] * 10
+
+def test_codesigner_cache(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(standalone_module.subprocess, 'run',
+                        lambda args, **kwds: calls.append(args))
+    app = tmp_path / 'a.app'
+    app.mkdir()
+    dylib = app / 'x.dylib'
+    dylib.write_bytes(b'')
+    s = standalone_module.CodeSigner(app)
+    s._sign([dylib])
+    standalone_module.save_cache(s.cache_name, s._signed)
+    assert len(calls) == 1
+    s = standalone_module.CodeSigner(app)
+    s._sign([dylib])
+    assert len(calls) == 1
+    s = standalone_module.CodeSigner(app, fresh=True)
+    s._sign([dylib])
+    assert len(calls) == 2
+
+def test_codesigner_cache_nested(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(standalone_module.subprocess, 'run',
+                        lambda args, **kwds: calls.append(args[-1]))
+    app = tmp_path / 'a.app'
+    fw = app / 'Contents' / 'Frameworks' / 'x.framework'
+    dylib = fw / 'Versions' / 'A' / 'lib.dylib'
+    dylib.parent.mkdir(parents=True)
+    dylib.write_bytes(b'abc')
+    s = standalone_module.CodeSigner(app)
+    s.sign_group('frameworks', 'Contents/Frameworks')
+    assert calls == [str(dylib), str(fw)]
+    s = standalone_module.CodeSigner(app)
+    s.sign_group('frameworks', 'Contents/Frameworks')
+    assert len(calls) == 2
+    dylib.write_bytes(b'abcd')
+    s = standalone_module.CodeSigner(app)
+    s.sign_group('frameworks', 'Contents/Frameworks')
+    assert calls[2:] == [str(dylib), str(fw)]
+    (fw / 'Versions' / 'A' / 'Info.plist').write_bytes(b'')
+    s = standalone_module.CodeSigner(app)
+    s.sign_group('frameworks', 'Contents/Frameworks')
+    assert calls[4:] == [str(fw)]
+
+def test_codesigner_fast(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(standalone_module.subprocess, 'run',
+                        lambda args, **kwds: calls.append(args))
+    app = tmp_path / 'a.app'
+    app.mkdir()
+    dylib = app / 'x.dylib'
+    dylib.write_bytes(b'')
+    s = standalone_module.CodeSigner(app, fast=True)
+    s._sign([dylib])
+    assert '--digest-algorithm=sha1' in calls[0]
+    assert '--timestamp' not in calls[0]
+    standalone_module.save_cache(s.cache_name, s._signed)
+    s = standalone_module.CodeSigner(app)
+    s._sign([dylib])
+    assert len(calls) == 2 and '--timestamp' in calls[1]
+
+def test_codesigner_fast_not_trusted(tmp_path, monkeypatch):
+    monkeypatch.setattr(standalone_module.CodeSigner, 'resolve_identity',
+                        lambda self: self.authority)
+    stderr = {'value': b'Identifier=x\nSigned Time=1 Jan 2026\n'}
+    signed = []
+    def run(args, **kwds):
+        if args[:2] == ['codesign', '--sign']:
+            signed.append(args[-1])
+        return standalone_module.subprocess.CompletedProcess(
+            args, 0, stderr=stderr['value'])
+    monkeypatch.setattr(standalone_module.subprocess, 'run', run)
+    app = tmp_path / 'a.app'
+    app.mkdir()
+    dylib = app / 'x.dylib'
+    dylib.write_bytes(b'')
+    # a valid but unstamped (fast) signature satisfies fast runs only
+    standalone_module.CodeSigner(app, 'Bugs Bunny', fast=True)._sign([dylib])
+    assert signed == []
+    standalone_module.CodeSigner(app, 'Bugs Bunny')._sign([dylib])
+    assert signed == [str(dylib)]
+    stderr['value'] = b'Identifier=x\nTimestamp=1 Jan 2026\n'
+    standalone_module.CodeSigner(app, 'Bugs Bunny')._sign([dylib])
+    assert signed == [str(dylib)]
+
+def test_codesigner_sign_group_order(tmp_path):
+    app = tmp_path / 'a.app'
+    fw = app / 'Contents' / 'Frameworks'
+    outer = fw / 'x.framework'
+    inner = outer / 'Versions' / 'A' / 'Frameworks' / 'y.framework'
+    inner.mkdir(parents=True)
+    (fw / 'z.dylib').write_bytes(b'')
+    s = standalone_module.CodeSigner(app)
+    assert s.nesting([inner, outer, fw / 'z.dylib']) == {inner: outer}
+    signed = []
+    s._sign = signed.extend
+    s.sign_group('frameworks', 'Contents/Frameworks')
+    assert sorted(signed) == sorted([inner, outer, fw / 'z.dylib'])
+    assert signed.index(inner) < signed.index(outer)
+
+def test_codesigner_sign_group_largest_first(tmp_path):
+    app = tmp_path / 'a.app'
+    fw = app / 'Contents' / 'Frameworks'
+    (fw / 'big.framework').mkdir(parents=True)
+    (fw / 'big.framework' / 'big').write_bytes(b'x' * 100)
+    (fw / 'small.dylib').write_bytes(b'x')
+    (fw / 'medium.dylib').write_bytes(b'x' * 10)
+    s = standalone_module.CodeSigner(app)
+    s.max_workers = 1
+    s.batch_size = 1
+    signed = []
+    s._sign = signed.extend
+    s.sign_group('frameworks', 'Contents/Frameworks')
+    assert [p.name for p in signed] == ['big.framework', 'medium.dylib', 'small.dylib']
+
+def test_codesigner_sign_group_failures(tmp_path):
+    app = tmp_path / 'a.app'
+    fw = app / 'Contents' / 'Frameworks'
+    inner = fw / 'x.framework' / 'Versions' / 'A' / 'Frameworks' / 'y.framework'
+    inner.mkdir(parents=True)
+    (fw / 'z.dylib').write_bytes(b'')
+    s = standalone_module.CodeSigner(app)
+    s.batch_size = 1
+    signed = []
+    def sign(paths):
+        if inner in paths:
+            raise standalone_module.subprocess.CalledProcessError(
+                1, 'codesign', stderr=f'{inner}: invalid'.encode())
+        signed.extend(paths)
+    s._sign = sign
+    with pytest.raises(RuntimeError):
+        s.sign_group('frameworks', 'Contents/Frameworks')
+    assert signed == [fw / 'z.dylib']
+
+def test_codesigner_attribute_errors():
+    paths = [pathlib.Path('a/x.dylib'), pathlib.Path('a/y.mxo')]
+    stderr = ('a/x.dylib: replacing existing signature\n'
+              'a/y.mxo: bundle format unrecognized, invalid, or unsuitable\n'
+              'In subcomponent: a/y.mxo/Contents/MacOS/y\n')
+    errors = standalone_module.CodeSigner.attribute_errors(paths, stderr)
+    assert errors == {paths[1]: 'bundle format unrecognized, invalid, or unsuitable'}
+
+def test_notarizer_paths():
+    n = standalone_module.Notarizer(['a.dmg', 'a.pkg'], 'id', 'pwd', 'com.a.b')
+    assert n.paths == [pathlib.Path('a.dmg'), pathlib.Path('a.pkg')]
+    assert n.path == pathlib.Path('a.dmg')
+    n = standalone_module.Notarizer('a.zip', 'id', 'pwd', 'com.a.b')
+    assert n.paths == [pathlib.Path('a.zip')]
+
+def test_notarizer_requires_credentials(monkeypatch):
+    for var in ('APPLE_ID', 'APP_PASSWORD', 'TEAM_ID'):
+        monkeypatch.delenv(var, raising=False)
+    n = standalone_module.Notarizer('a.zip', None, 'pwd', 'com.a.b', team_id='t')
+    with pytest.raises(ValueError, match='APPLE_ID'):
+        n.notarize()
+
+def test_notarizer_cache_survives_stapling(tmp_path):
+    import asyncio
+    dmg = tmp_path / 'a.dmg'
+    dmg.write_bytes(b'signed')
+    n = standalone_module.Notarizer(dmg, 'id', 'pwd', 'com.a.b', staple=True)
+    n.cache = {}
+    submitted, stapled = [], set()
+    async def notarytool(*args, timeout=None):
+        submitted.append(args)
+        return 0, {'id': 'abc', 'status': 'Accepted'}
+    async def is_stapled(target):
+        return target in stapled
+    async def staple(target):
+        target.write_bytes(b'signed+ticket')
+        stapled.add(target)
+    n._notarytool, n._is_stapled, n._staple = notarytool, is_stapled, staple
+    assert asyncio.run(n._notarize_one(dmg))['status'] == 'Accepted'
+    assert len(submitted) == 1 and len(n.cache) == 2
+    stapled.clear()  # the cache alone must recognize the stapled dmg
+    assert asyncio.run(n._notarize_one(dmg))['message'] == 'cached'
+    assert len(submitted) == 1
+
+def test_notarizer_failures_raise(tmp_path, monkeypatch):
+    ok, bad = tmp_path / 'ok.dmg', tmp_path / 'bad.dmg'
+    n = standalone_module.Notarizer([ok, bad], 'id', 'pwd', 'com.a.b', team_id='t')
+    async def notarize_all():
+        return [{'status': 'Accepted'}, RuntimeError('Invalid')]
+    monkeypatch.setattr(n, '_notarize_all', notarize_all)
+    with pytest.raises(standalone_module.NotarizationError) as excinfo:
+        n.notarize()
+    assert list(excinfo.value.failures) == [bad]
+    assert 'bad.dmg' in str(excinfo.value)
+
+def test_distributor_product():
+    d = standalone_module.Distributor('Foo.app', None, '1.0', 'arm64')
+    assert d.product == pathlib.Path('foo-1.0-arm64.zip')
+    d = standalone_module.Distributor('out/Foo.dmg', None, '1.0', 'arm64')
+    assert d.product == pathlib.Path('out/foo-1.0-arm64.dmg')
+
+def test_standalone_from_config(tmp_path):
+    cfg = tmp_path / 'config.json'
+    cfg.write_text(standalone_module.json.dumps({
+        'version': '1.0', 'dev_id': 'x', 'apple_id': 'a', 'app_password': 'p',
+        'app_bundle_id': 'com.a.b', 'arch': 'arm64', 'pre_clean': True}))
+    s = standalone_module.Standalone.from_config('a.app', cfg)
+    assert (s.method, s.arch, s.remove_attrs) == ('zip', 'arm64', True)
+
+def test_standalone_process_short_circuit(tmp_path, monkeypatch):
+    app = tmp_path / 'a.app'
+    (app / 'Contents').mkdir(parents=True)
+    product = tmp_path / 'a-0.0.1-dual.zip'
+    calls = []
+    def process_as_zip():
+        calls.append(1)
+        product.write_bytes(b'')
+        return product
+    s = standalone_module.Standalone(app)
+    monkeypatch.setattr(s, 'process_as_zip', process_as_zip)
+    assert s.process() == product
+    assert s.process() == product
+    assert len(calls) == 1
+    (app / 'Contents' / 'x').write_bytes(b'')
+    s.process()
+    assert len(calls) == 2
+    s.dev_id = 'Bugs Bunny'
+    s.process()
+    assert len(calls) == 3
+    s.norm_perms = True
+    s.process()
+    assert len(calls) == 4
+
 # def test_standalone_preprocess(standalone):
 #     s = standalone_module.Standalone(standalone)
 #     preprocessed = s.preprocess()